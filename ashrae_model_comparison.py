@@ -8,35 +8,34 @@ from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import KFold
 from math import sqrt
 from bayes_functions import bayesian_model_comparison
-import subprocess
+from bayes_models import balance_cross_validation_specs
+from ashrae_preprocess import preprocess_building
+from bdg_columnar import building_data, building_ids, open_portfolio
 import openpyxl
 
-# Import ASHRAE dataset
+# Import ASHRAE dataset (columnar copy of electricity_cleaned.csv and weather.csv, converted on the first run)
 
-bdg_df = pd.read_csv("~/Github/Bayes-M&V/data/building_data_genome_2/electricity_cleaned.csv")
-bdg_weather = pd.read_csv("~/Github/Bayes-M&V/data/building_data_genome_2/weather.csv")
+bdg_portfolio = open_portfolio("~/Github/Bayes-M&V/data/building_data_genome_2/columnar/",
+                               "~/Github/Bayes-M&V/data/building_data_genome_2/electricity_cleaned.csv",
+                               "~/Github/Bayes-M&V/data/building_data_genome_2/weather.csv")
 bdg_metadata = pd.read_csv("~/Github/Bayes-M&V/data/building_data_genome_2/metadata.csv")
 
 # First let's try only with a small subset (Crow = 5 buildings)
 
-crow_df = bdg_df.loc[:, bdg_df.columns.str.startswith(('Crow', 'timestamp'))]
+crow_ids = building_ids(bdg_portfolio, 'Crow')
 
 # Create for loop to create a dataset from one column at a time
 
-for building in crow_df.loc[:, crow_df.columns != 'timestamp']:
-    weather_df = bdg_weather.loc[bdg_weather.site_id.str.startswith(building[0:3]),:][['timestamp','airTemperature']]
-    df = pd.merge(crow_df[['timestamp',building]], weather_df, on = 'timestamp')
-    df = df.dropna()
+for building in crow_ids:
+    df = building_data(bdg_portfolio, building)
     df.columns = ['t', 'total_electricity', 'outdoor_temp']
 
-    edif = "current_df"
-    df.to_csv(edif + ".csv", index = False)
-    subprocess.run(["Rscript", "ashrae_preprocess.R", edif])
-
-    df_preprocessed = pd.read_csv(edif + "_preprocess.csv")
+    df_preprocessed = preprocess_building(df)
     print(df_preprocessed.head())
 
-    model_results = bayesian_model_comparison(df_preprocessed)
+    # preprocess_building has no low pass temperatures, the models use the balance temperature of outdoor_temp
+    # (exported as pp_balance_*, np_balance_* and cp_balance_*)
+    model_results = bayesian_model_comparison(df_preprocessed, specs=balance_cross_validation_specs)
     model_results['id'] = building
     # read the Excel with the values from previous buildings
     # append to that Excel
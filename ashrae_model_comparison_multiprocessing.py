@@ -1,30 +1,39 @@
-from bayes_functions_multiprocessing import *
-import multiprocessing
+from bayes_models import specs_hash, test_4_specs
+from bdg_columnar import building_ids, open_portfolio
+from building_scheduler import building_costs, building_hashes, outstanding_buildings, run_buildings
+from results_store import cluster_counts, create_store, export_results, load_manifest, set_status
 
-# Import ASHRAE dataset
+# Import ASHRAE dataset (columnar copy of electricity_cleaned.csv and weather.csv, converted on the first run)
 
-bdg_df = pd.read_csv("/root/benedetto/data/bdg/electricity_cleaned.csv")
-bdg_weather = pd.read_csv("/root/benedetto/data/bdg/weather.csv")
+bdg_portfolio = open_portfolio()
 
 # Run one building subset at the time
 
-subset_df = bdg_df
-#subset_df = bdg_df.loc[:, bdg_df.columns.str.startswith(('Fox', 'timestamp'))]
+subset_ids = building_ids(bdg_portfolio)
+#subset_ids = building_ids(bdg_portfolio, 'Fox')
 
-buildings = []
+# Only the buildings without results for the current specs and data are run (see the manifest of results_store)
 
-for building in subset_df.loc[:, subset_df.columns != 'timestamp']:
-    weather_df = bdg_weather.loc[bdg_weather.site_id.str.startswith(building[0:3]),:][['timestamp','airTemperature']]
-    df = pd.merge(subset_df[['timestamp',building]], weather_df, on = 'timestamp')
-    df = df.dropna()
-    buildings.append(df)
+create_store()
+current_spec_hash = specs_hash(test_4_specs)
+data_hashes = building_hashes(bdg_portfolio, subset_ids)
+outstanding = outstanding_buildings(subset_ids, load_manifest(), current_spec_hash, data_hashes)
+print(str(len(outstanding)) + " of " + str(len(subset_ids)) + " buildings to calculate")
 
-print("Start multithreading pool")
+# Longest buildings first (hours times the profile clusters found by earlier runs), the workers only get the building
+# ids and read the portfolio from shared memory.
+# With batch_size > 1 the ADVI models of batch_size buildings are fitted together in one batched model
 
-with multiprocessing.Pool(8) as pool:
-    print("Launch calculations")
-    tasks = [pool.apply_async(multiprocessing_bayesian_comparison,(x,)) for x in buildings]
-    [t.get() for t in tasks]
-    print("End")
+batch_size = 1
 
+costs = building_costs(bdg_portfolio, outstanding, cluster_counts())
 
+print("Start multithreading pool")
+print("Launch calculations")
+for building_id, status in run_buildings(costs.index, 8, portfolio=bdg_portfolio, batch_size=batch_size):
+    set_status(building_id, current_spec_hash, data_hashes[building_id], status)
+    print("Finished " + building_id + ": " + status)
+
+# Results csv of the whole portfolio
+export_results()
+print("End")
@@ -0,0 +1,48 @@
+import multiprocessing
+import pandas as pd
+from ashrae_preprocess import preprocess_building
+from bayes_functions_multiprocessing import bayesian_model_comparison_portfolio
+from bdg_columnar import building_data, building_ids, open_portfolio
+from results_store import add_results, create_store, export_results
+
+# Portfolio model: one partial pooling model of every building, pooled across the buildings of the same site and use
+# type, fitted with minibatch ADVI in a single run instead of one fit per building
+
+portfolio_results_path = "/root/benedetto/results/portfolio_results.sqlite"
+
+# Import ASHRAE dataset (columnar copy of electricity_cleaned.csv and weather.csv, converted on the first run)
+
+bdg_portfolio = open_portfolio()
+bdg_metadata = pd.read_csv("/root/benedetto/data/bdg/metadata.csv")
+
+# Run one building subset at the time
+
+subset_ids = building_ids(bdg_portfolio)
+#subset_ids = building_ids(bdg_portfolio, ('Fox', 'Rat'))
+
+
+def preprocess(building_id):
+    df = building_data(bdg_portfolio, building_id)
+    df.columns = ['t', 'total_electricity', 'outdoor_temp']
+    try:
+        return preprocess_building(df)
+    except Exception as e:
+        print(e)
+        print("Preprocessing failed for " + building_id + '. Leaving it out of the portfolio.')
+        return None
+
+
+if __name__ == "__main__":
+    # Preprocessing is per building, in parallel
+    with multiprocessing.Pool(8) as pool:
+        dfs = pool.map(preprocess, subset_ids, chunksize=1)
+    portfolio_ids = [building_id for building_id, df in zip(subset_ids, dfs) if df is not None]
+    dfs = [df for df in dfs if df is not None]
+
+    print("Fit the portfolio model of " + str(len(portfolio_ids)) + " buildings")
+    model_results = bayesian_model_comparison_portfolio(dfs, portfolio_ids, bdg_metadata)
+
+    create_store(portfolio_results_path)
+    add_results(model_results, portfolio_results_path)
+    export_results("/root/benedetto/results/portfolio_results.csv", portfolio_results_path)
+    print("End")
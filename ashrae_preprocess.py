@@ -0,0 +1,261 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cdist
+from sklearn.cluster import KMeans
+
+from fourier_features import fourier_frame
+
+# Python port of ashrae_preprocess_server.R and the functions of preprocessing/functions_updated.R it uses
+# (norm_load_curves, clustering_load_curves, classifier_load_curves, add_fs_daypart, add_fs_yearpart).
+# preprocess_building returns the same columns as the _preprocess.csv written by the R script, without spawning
+# Rscript or writing temporary files
+
+tz_local = "Europe/Madrid"
+
+# Clustering settings tried in order until more than one cluster is found
+clustering_configs = [
+    {"perc_cons": False, "n_dayparts": 24, "input_vars": ("load_curves", "days_weekend", "day_of_the_year")},
+    {"perc_cons": True, "n_dayparts": 24, "input_vars": ("load_curves", "day_of_the_year")},
+    {"perc_cons": True, "n_dayparts": 4, "input_vars": ("min_cons", "max_cons", "daily_cons")},
+    {"perc_cons": True, "n_dayparts": 4, "input_vars": ("max_cons", "daily_cons")}]
+
+hours_of_each_daypart = 4
+
+
+def normalize_range_int(x, inf, sup, specs=None):
+    # Column-wise min-max scaling to [inf, sup], constant columns become inf
+    if specs is None:
+        specs = (np.nanmin(x, axis=0), np.nanmax(x, axis=0))
+    x_min, x_max = specs
+    with np.errstate(invalid="ignore", divide="ignore"):
+        norm = (x - x_min) / (x_max - x_min) * (sup - inf) + inf
+    norm[:, x_min == x_max] = inf
+    return norm, specs
+
+
+def norm_load_curves(df, perc_cons=True, n_dayparts=24, norm_specs=None,
+                     input_vars=("load_curves", "days_weekend", "days_of_the_week", "daily_cons", "daily_temp"),
+                     filter_na=True, time_column="t", value_column="total_electricity",
+                     temperature_column="outdoor_temp"):
+    # Daily input matrix of the clustering (one row per day) normalized to [0, 1]
+    time = df[time_column]
+    df_agg = pd.DataFrame({"time": time.values,
+                           "temperature": df[temperature_column].values,
+                           "day": time.dt.normalize().values,
+                           "value": df[value_column].values,
+                           "dayhour": time.dt.hour.values,
+                           "daypart": np.ceil(time.dt.hour.values / (24 / n_dayparts)).astype(int)})
+    df_agg_d = df_agg.groupby("day").agg(value=("value", lambda x: x.mean() * 24),
+                                         max_value=("value", "max"),
+                                         min_value=("value", "min"),
+                                         temperature=("temperature", "mean"))
+    df_agg = df_agg.drop_duplicates(["dayhour", "day"])
+
+    if n_dayparts == 24:
+        df_spread = df_agg.pivot(index="day", columns="dayhour", values="value")
+    else:
+        df_spread = df_agg.groupby(["day", "daypart"])["value"].mean().unstack("daypart")
+    df_spread = df_spread.join(df_agg_d, how="inner")
+
+    days = df_spread.index.values
+    max_cons = df_spread["max_value"].values
+    min_cons = df_spread["min_value"].values
+    daily_cons = df_spread["value"].values
+    daily_temp = df_spread["temperature"].values
+    days_of_the_week = pd.DatetimeIndex(days).dayofweek.values + 1
+    days_weekend = np.isin(days_of_the_week, (6, 7)).astype(float)
+    day_of_the_year = pd.DatetimeIndex(days).month.values
+
+    # As in R, the daily max and min stay next to the hourly (daypart) values of the load curves
+    load_curves = df_spread.drop(columns=["value", "temperature"]).values.astype(float)
+    if perc_cons:
+        load_curves = load_curves / (np.nanmean(load_curves, axis=1, keepdims=True) * 24)
+
+    inputs = {"load_curves": load_curves, "days_weekend": days_weekend, "days_of_the_week": days_of_the_week,
+              "daily_cons": daily_cons, "daily_temp": daily_temp, "max_cons": max_cons, "min_cons": min_cons,
+              "day_of_the_year": day_of_the_year}
+    norm_df = np.column_stack([np.asarray(inputs[name], dtype=float) for name in input_vars])
+    norm_df, norm_specs = normalize_range_int(norm_df, 0, 1, norm_specs)
+
+    if filter_na:
+        complete_cases = ~np.isnan(norm_df).any(axis=1)
+        days = days[complete_cases]
+        norm_df = norm_df[complete_cases]
+
+    return {"raw_df": df_agg, "norm_df": norm_df, "norm_specs": norm_specs, "perc_cons": perc_cons,
+            "n_dayparts": n_dayparts, "input_vars": input_vars, "days_complete": days}
+
+
+def make_affinity(similarity, n_neighbours=2):
+    # Connect every day to its n_neighbours most similar days (symmetric)
+    n = len(similarity)
+    if n_neighbours >= n:
+        return similarity
+    affinity = np.zeros_like(similarity)
+    for i in range(n):
+        for s in np.sort(similarity[i])[::-1][:n_neighbours]:
+            j = similarity[i] == s
+            affinity[i, j] = similarity[i, j]
+            affinity[j, i] = similarity[i, j]
+    return affinity
+
+
+def n_clusters_eigengap(x, kmax=30):
+    # Number of clusters from the largest gap in the log spectrum of the k-nearest neighbours graph Laplacian
+    similarity = np.exp(-cdist(x, x))
+    np.fill_diagonal(similarity, 0)
+    affinity = make_affinity(similarity, 3)
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    eigenvalues = np.linalg.eigvalsh(laplacian)[:kmax]
+    spectrum = np.log(eigenvalues + 1e-12)
+    return int(np.argmax(np.diff(spectrum))) + 1
+
+
+def spectral_embedding(kernel, n_clusters):
+    # Normalized leading eigenvectors of D^-1/2 K D^-1/2 (Ng, Jordan and Weiss)
+    d = 1 / np.sqrt(kernel.sum(axis=1))
+    eigenvalues, eigenvectors = np.linalg.eigh(d[:, None] * kernel * d[None, :])
+    xi = eigenvectors[:, ::-1][:, :n_clusters]
+    return xi / np.sqrt((xi ** 2).sum(axis=1, keepdims=True))
+
+
+def rbf_kernel(distances, width):
+    kernel = np.exp(-distances ** 2 / (2 * width ** 2))
+    np.fill_diagonal(kernel, 0)
+    return kernel
+
+
+def specc(x, n_clusters, random_state=0):
+    # Spectral clustering with the automatic RBF width of kernlab::specc: the width giving the most compact k-means
+    # clusters of the embedding of a 75% sample of the days. Returns the labels (from 1) and centers in input space
+    rng = np.random.default_rng(random_state)
+    sample = np.unique(x[rng.choice(len(x), int(np.floor(0.75 * len(x))), replace=False)], axis=0)
+    distances = cdist(sample, sample)
+    kmea = distances.mean()
+    kmax = distances.max()
+    kmin = (distances + np.diag(np.full(len(sample), np.inf))).min()
+    widths = np.concatenate([np.arange(max(kmea / 2, kmin), 0.9 * kmea, 0.05 * kmea),
+                             np.arange(kmea, min(2 * kmea, kmax), 0.08 * kmea)])
+
+    withinss = np.full(len(widths), np.inf)
+    for i, width in enumerate(widths):
+        kernel = rbf_kernel(distances, width)
+        d = kernel.sum(axis=1)
+        if np.all(d > 0) and np.all(np.isfinite(d)) and np.ptp(1 / np.sqrt(d)) < 1e4:
+            embedding = spectral_embedding(kernel, n_clusters)
+            withinss[i] = KMeans(n_clusters, n_init=1, random_state=random_state).fit(embedding).inertia_
+    if not np.isfinite(withinss).any():
+        raise ValueError("No valid kernel width for spectral clustering")
+
+    kernel = rbf_kernel(cdist(x, x), widths[np.argmin(withinss)])
+    embedding = spectral_embedding(kernel, n_clusters)
+    labels = KMeans(n_clusters, n_init=1, random_state=random_state).fit_predict(embedding)
+    centers = np.array([x[labels == label].mean(axis=0) for label in range(n_clusters)])
+    return labels + 1, centers
+
+
+def clustering_load_curves(df, perc_cons, n_dayparts, input_vars, norm_specs=None, kmax=30, random_state=0):
+    # Daily load profile clusters of the training period: label of every day, centers in the normalized input
+    # space, mean hourly load curve of every cluster and weekday calendar model
+    input_clust = norm_load_curves(df, perc_cons, n_dayparts, norm_specs, input_vars)
+    norm_df = input_clust["norm_df"]
+
+    k = n_clusters_eigengap(norm_df, kmax)
+    try:
+        if k < 2:
+            raise ValueError("Single cluster")
+        labels, clustering_centroids = specc(norm_df, k, random_state)
+    except Exception:
+        labels = np.ones(len(norm_df), dtype=int)
+        clustering_centroids = np.nanmean(norm_df, axis=0, keepdims=True)
+
+    classified = pd.DataFrame({"day": input_clust["days_complete"], "s": labels})
+    df_structural = input_clust["raw_df"].merge(classified, on="day")
+
+    # Daily load curves centroids
+    centroids = df_structural.groupby(["s", "dayhour"])["value"].mean().unstack("dayhour")
+
+    # Simple calendar classification by day of the week (the most frequent cluster of every weekday, which is
+    # what the multinomial model on the weekday dummies predicts)
+    dayweek = pd.DatetimeIndex(df_structural["time"]).dayofweek + 1
+    mod_calendar = df_structural.groupby(dayweek)["s"].agg(lambda s: s.value_counts().idxmax())
+    mod_calendar = mod_calendar.reindex(range(1, 8), fill_value=df_structural["s"].value_counts().idxmax())
+
+    return {"classified": classified, "clustering_centroids": clustering_centroids, "centroids": centroids,
+            "norm_specs": input_clust["norm_specs"], "perc_cons": perc_cons, "n_dayparts": n_dayparts,
+            "mod_calendar": mod_calendar, "input_vars": input_vars}
+
+
+def classifier_load_curves(df, clustering, time_column="t", value_column="total_electricity"):
+    # Cluster of every day of df: nearest clustering centroid in the normalized input space, else nearest load
+    # curve centroid, else the calendar model
+    input_class = norm_load_curves(df, clustering["perc_cons"], clustering["n_dayparts"],
+                                   clustering["norm_specs"], clustering["input_vars"], filter_na=False)
+    norm_df = np.nan_to_num(input_class["norm_df"])
+    classification = pd.Series(np.argmin(cdist(norm_df, clustering["clustering_centroids"]), axis=1) + 1,
+                               index=input_class["days_complete"], dtype=float)
+
+    # Wide format of the consumption dataframe
+    time = df[time_column]
+    consumption = pd.DataFrame({"date": time.dt.normalize().values, "hour": time.dt.hour.values,
+                                "value": df[value_column].values}).drop_duplicates(["hour", "date"])
+    consumption = consumption.pivot(index="date", columns="hour", values="value").reindex(columns=range(24),
+                                                                                          fill_value=0)
+    centroids = clustering["centroids"].reindex(columns=range(24))
+    dist_shapes = cdist(consumption.values, centroids.values)
+    load_curve = pd.Series(np.where(np.isnan(dist_shapes).sum(axis=1) > 1, np.nan,
+                                    centroids.index.values[np.argmin(np.nan_to_num(dist_shapes, nan=np.inf),
+                                                                     axis=1)]),
+                           index=consumption.index)
+    calendar = pd.Series(clustering["mod_calendar"].reindex(consumption.index.dayofweek + 1).values,
+                         index=consumption.index)
+
+    return classification.reindex(consumption.index).fillna(load_curve).fillna(calendar)
+
+
+def add_fs_daypart(df, time_column="t"):
+    return pd.concat([df, fourier_frame(df[time_column], ("daypart",), 3, np.float64)], axis=1)
+
+
+def add_fs_yearpart(df, time_column="t"):
+    return pd.concat([df, fourier_frame(df[time_column], ("yearpart",), 3, np.float64)], axis=1)
+
+
+def preprocess_building(df, random_state=0):
+    # df with t (local time), total_electricity and outdoor_temp -> model input dataframe with the profile cluster
+    # s (from 1), daypart, weekday (1 = Monday) and the daypart and yearpart Fourier terms
+    df = df.copy()
+    df["t"] = pd.to_datetime(df["t"])
+
+    # Hours that do not exist in local time (spring DST change) are dropped as in R
+    local = df["t"].dt.tz_localize(tz_local, nonexistent="NaT", ambiguous=np.ones(len(df), dtype=bool))
+    df = df[local.notna().values].sort_values("t").reset_index(drop=True)
+
+    train_df = df[df["t"] < pd.Timestamp("2017-01-01")]
+    test_df = df[df["t"] >= pd.Timestamp("2017-01-01")]
+
+    for config in clustering_configs:
+        clustering = clustering_load_curves(train_df, random_state=random_state, **config)
+        if len(clustering["centroids"]) > 1:
+            break
+
+    # Classification of load patterns, days of the training period keep their cluster
+    classification = classifier_load_curves(test_df, clustering)
+    classification = pd.concat([clustering["classified"].set_index("day")["s"], classification])
+    classification = classification[~classification.index.duplicated()]
+
+    df["s"] = classification.reindex(df["t"].dt.normalize()).values
+
+    # Add Fourier terms
+    df = add_fs_daypart(df)
+    df = add_fs_yearpart(df)
+
+    # Add daypart and weekday
+    df["daypart"] = df["t"].dt.hour // hours_of_each_daypart
+    df["weekday"] = df["t"].dt.dayofweek + 1
+
+    df_export = df[["t", "total_electricity", "outdoor_temp", "s", "daypart", "weekday"] +
+                   [column for column in df.columns if column.startswith(("daypart_fs", "yearpart_fs"))]]
+    df_export = df_export.dropna().reset_index(drop=True)
+    df_export["s"] = df_export["s"].astype(int)
+    return df_export
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Exact posterior of the linear models y ~ Normal(Z theta, sigma) with independent Normal(0, prior_sigma) coefficients
+# and sigma ~ Exponential(sigma_rate) (the priors of the no and complete pooling linear specs), computed from the
+# design statistics of bayes_models.design_statistics instead of ADVI. theta | sigma is Gaussian (conjugate) and sigma
+# has a one dimensional marginal, with theta integrated out, that is evaluated on a grid. With the eigenvalues lambda
+# of Z'Z, b = U' theta_hat and r = sigma^2 / prior_sigma^2:
+# log p(y | sigma) = -n log sigma - sum(log(1 + lambda / r)) / 2 - (rss + sum(lambda b^2 r / (lambda + r))) / 2 sigma^2
+# theta | sigma, y ~ Normal(U (lambda b / (lambda + r)), U diag(sigma^2 / (lambda + r)) U')
+
+# Points of the coarse grid locating the posterior of log sigma and of the fine grid the draws come from
+coarse_grid_size = 2001
+fine_grid_size = 2001
+
+
+def eigen_statistics(stats):
+    eigenvalues, eigenvectors = np.linalg.eigh(stats["xtx"])
+    eigenvalues = np.clip(eigenvalues, 0, None)
+    return eigenvalues, eigenvectors, eigenvectors.T @ stats["theta_hat"]
+
+
+def log_sigma_density(log_sigma, eigenvalues, b, stats, prior_sigma=1.0, sigma_rate=1.0):
+    # Unnormalized log posterior density of log sigma (Exponential prior and its Jacobian included)
+    sigma2 = np.exp(2 * log_sigma)[:, None]
+    r = sigma2 / prior_sigma ** 2
+    squares = stats["rss"] + np.sum(eigenvalues * b ** 2 * r / (eigenvalues + r), axis=1)
+    return -float(stats["n_obs"]) * log_sigma - 0.5 * np.sum(np.log1p(eigenvalues / r), axis=1) - \
+           0.5 * squares / sigma2[:, 0] - sigma_rate * np.exp(log_sigma) + log_sigma
+
+
+def sigma_grid(eigenvalues, b, stats, prior_sigma=1.0, sigma_rate=1.0):
+    # Fine log sigma grid over the region holding the posterior mass, found on a wide coarse grid around the least
+    # squares residual scale
+    scale = np.log(np.sqrt((float(stats["rss"]) + 1e-12) / max(float(stats["n_obs"]), 1.0)))
+    coarse = np.linspace(scale - 10, scale + 10, coarse_grid_size)
+    density = log_sigma_density(coarse, eigenvalues, b, stats, prior_sigma, sigma_rate)
+    mass = np.flatnonzero(density > density.max() - 40)
+    step = coarse[1] - coarse[0]
+    return np.linspace(coarse[mass[0]] - step, coarse[mass[-1]] + step, fine_grid_size)
+
+
+def conjugate_draws(stats, draws=1000, prior_sigma=1.0, sigma_rate=1.0, random_seed=None):
+    # Independent posterior draws: theta (draws x parameters, in the column order of the design) and sigma (draws)
+    rng = np.random.default_rng(random_seed)
+    eigenvalues, eigenvectors, b = eigen_statistics(stats)
+
+    # sigma from its marginal on the grid, uniform within the grid cells
+    grid = sigma_grid(eigenvalues, b, stats, prior_sigma, sigma_rate)
+    density = log_sigma_density(grid, eigenvalues, b, stats, prior_sigma, sigma_rate)
+    probabilities = np.exp(density - density.max())
+    cells = rng.choice(len(grid), size=draws, p=probabilities / probabilities.sum())
+    log_sigma = grid[cells] + (rng.random(draws) - 0.5) * (grid[1] - grid[0])
+    sigma = np.exp(log_sigma)
+
+    # theta | sigma in the eigenbasis of Z'Z
+    r = (sigma ** 2 / prior_sigma ** 2)[:, None]
+    mean = eigenvalues * b / (eigenvalues + r)
+    sd = sigma[:, None] / np.sqrt(eigenvalues + r)
+    theta = (mean + sd * rng.standard_normal((draws, len(eigenvalues)))) @ eigenvectors.T
+    return theta, sigma
@@ -9,345 +9,96 @@ from sklearn.model_selection import KFold
 from math import sqrt
 
 import subprocess
-def bayesian_model_comparison (df):
-    # Preprocess
-    df["log_v"] = log_electricity = np.log(df["total_electricity"]).values
-    total_electricity = df.total_electricity.values
-
-    # Create local variables (assign daypart, cluster and weekday values need to start from 0)
-    # clusters are use profile categories, heat_clusters and cool_clusters indicate days having similar
-    # temperature dependence (likely to modify this in the new version of the preprocessing)
-
-    df.t = pd.to_datetime(pd.Series(df.t))
-    df.s = df.s - 1
-    df.weekday = df.weekday - 1
-    clusters = df.s
-    unique_clusters = clusters.unique()
-    dayparts = df.daypart
-    weekdays = df.weekday
-    unique_dayparts = dayparts.unique()
-    unique_weekdays = weekdays.unique()
-    n_hours = len(df.index)
-    outdoor_temp_c = df.outdoor_temp_c
-    outdoor_temp_h = df.outdoor_temp_h
-    outdoor_temp_lp_c = df.outdoor_temp_lp_c
-    outdoor_temp_lp_h = df.outdoor_temp_lp_h
-    daypart_fs_sin_1 = df.daypart_fs_sin_1
-    daypart_fs_sin_2 = df.daypart_fs_sin_2
-    daypart_fs_sin_3 = df.daypart_fs_sin_3
-    daypart_fs_cos_1 = df.daypart_fs_cos_1
-    daypart_fs_cos_2 = df.daypart_fs_cos_2
-    daypart_fs_cos_3 = df.daypart_fs_cos_3
+from bayes_models import conjugate_supported, cross_validation_specs, evaluate_spec, minibatch_spec, model_coords, \
+    prepare_building
+from bayes_inference import chained_state
+from fold_executor import run_folds
+
+
+# Telemetry of every fit exported with the metrics (see bayes_inference.fit_telemetry), to tune the iteration cap
+# and the inference method policy
+fit_metrics = {'iterations': 'iterations', 'elbo': 'elbo', 'fit_seconds': 'fit_seconds', 'method': 'method'}
+
+
+def evaluate_fold(task):
+    # Metrics (name, export column) -> value of every spec on one fold, fitting, then posterior predictive of the
+    # test fold computed in NumPy from the draws: predictions, HDI, cvrmse and coverage of the HDI
+    specs, coords, train_df, test_df, mean_observed, random_seed, reuse_models, metrics, warm_states = task
+    fold_metrics = {}
+    previous = None
+    for name, spec in specs.items():
+        # warm_states (spec name -> approximation state) chain the folds: every spec starts from its fit on the
+        # previous fold, on the first fold from the spec fitted before it (the variants share most parameters)
+        warm_state = None
+        if warm_states is not None:
+            warm_state = chained_state(warm_states, name, previous)
+            previous = name
+        trace, summary = evaluate_spec(spec, coords, train_df, test_df, mean_observed=mean_observed,
+                                       random_seed=random_seed, reuse=reuse_models, warm_state=warm_state)
+        for column, metric in metrics.items():
+            fold_metrics[name, column] = summary[metric]
+    return fold_metrics
+
+
+def bayesian_model_comparison (df, reuse_models=True, random_seed=None, metrics=None, likelihood="observed",
+                               conjugate=False, n_workers=1, minibatch=None, warm_start=False, specs=None):
+    # Preprocess (assign daypart, cluster and weekday values need to start from 0)
+    df = prepare_building(df)
 
     # create coords for pymc3
-    coords = {"obs_id": np.arange(total_electricity.size)}
-    coords["profile_cluster"] = unique_clusters
-    coords["daypart"] = unique_dayparts
-    coords["weekday"] = unique_weekdays
+    coords = model_coords(df)
 
     # Create kfold cross-validation splits
 
     kf = KFold(n_splits=5)
     kf.get_n_splits(df)
 
-    # Create arrays to save model results
-    partial_pool_cvrmse_list = []
-    no_pool_cvrmse_list = []
-    complete_pool_cvrmse_list = []
-
-    partial_pool_coverage_list = []
-    no_pool_coverage_list = []
-    complete_pool_coverage_list = []
-
-    for train_index, test_index in kf.split(df):
-        coords = {"obs_id": np.arange(total_electricity[train_index].size)}
-        coords["profile_cluster"] = unique_clusters
-        coords["daypart"] = unique_dayparts
-        coords["weekday"] = unique_weekdays
-
-        # Partial Pooling
-
-        with pm.Model(coords=coords) as partial_pooling:
-            profile_cluster_idx = pm.Data("profile_cluster_idx", clusters[train_index], dims="obs_id")
-            daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
-            weekday = pm.Data("weekday", weekdays[train_index], dims="obs_id")
-
-            fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-            fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-            fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-
-            fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-            fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-            fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-
-            # cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
-            # heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
-            cooling_temp_lp = pm.Data("cooling_temp_lp", outdoor_temp_lp_c[train_index], dims="obs_id")
-            heating_temp_lp = pm.Data("heating_temp_lp", outdoor_temp_lp_h[train_index], dims="obs_id")
-
-            # Hyperpriors:
-            bf = pm.Normal("bf", mu=0.0, sigma=1.0)
-            sigma_bf = pm.Exponential("sigma_bf", 1.0)
-            a = pm.Normal("a", mu=0.0, sigma=1.0)
-            sigma_a = pm.Exponential("sigma_a", 1.0)
-
-            # btc = pm.Normal("btc", mu=0.0, sigma=1.0, dims="daypart")
-            # bth = pm.Normal("bth", mu=0.0, sigma=1.0, dims="daypart")
-
-            btclp = pm.Normal("btclp", mu=0.0, sigma=1.0, dims="daypart")
-            bthlp = pm.Normal("bthlp", mu=0.0, sigma=1.0, dims="daypart")
-
-            # Varying intercepts
-            a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart", "profile_cluster"))
-
-            # Varying slopes:
-            bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-            bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-            bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-
-            bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-            bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-            bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims=("profile_cluster"))
-
-            # Expected value per county:
-            mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + \
-                 bs2[profile_cluster_idx] * fs_sin_2 + bs3[profile_cluster_idx] * fs_sin_3 + \
-                 bc1[profile_cluster_idx] * fs_cos_1 + bc2[profile_cluster_idx] * fs_cos_2 + \
-                 bc3[profile_cluster_idx] * fs_cos_3 + \
-                 btclp[daypart] * cooling_temp_lp + \
-                 bthlp[daypart] * heating_temp_lp
-            # btc[daypart] * cooling_temp + bth[daypart] * heating_temp + \
-
-            # Model error:
-            sigma = pm.Exponential("sigma", 1.0)
-
-            # Likelihood
-            y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
-
-        # Fitting
-        with partial_pooling:
-            approx = pm.fit(n=50000,
-                            method='fullrank_advi',
-                            callbacks=[CheckParametersConvergence(tolerance=0.01)])
-            partial_pooling_trace = approx.sample(1000)
-
-        # Sampling from the posterior setting test data to check the predictions on unseen data
-
-        with partial_pooling:
-            pm.set_data({"profile_cluster_idx": clusters[test_index], "daypart": dayparts[test_index],  # "weekday":weekdays,
-                         "fs_sin_1": daypart_fs_sin_1[test_index], "fs_sin_2": daypart_fs_sin_2[test_index], "fs_sin_3": daypart_fs_sin_3[test_index],
-                         "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index], "fs_cos_3": daypart_fs_cos_3[test_index],
-                         # "cooling_temp":outdoor_temp_c, "heating_temp": outdoor_temp_h,
-                         "cooling_temp_lp": outdoor_temp_lp_c[test_index],
-                         "heating_temp_lp": outdoor_temp_lp_h[test_index]
-                         })
-
-            partial_pool_posterior_hdi = pm.sample_posterior_predictive(partial_pooling_trace, keep_size=True) 
-            partial_pool_posterior = pm.sample_posterior_predictive(partial_pooling_trace)
-            partial_pool_prior = pm.sample_prior_predictive(150)
-
-
-        # Calculate predictions and HDI
-
-        partial_pool_predictions = np.exp(partial_pool_posterior['y'].mean(0))
-        hdi_data = az.hdi(partial_pool_posterior_hdi)
-        partial_pool_lower_bound = np.array(np.exp(hdi_data.to_array().sel(hdi='lower'))).flatten()
-        partial_pool_higher_bound = np.array(np.exp(hdi_data.to_array().sel(hdi='higher'))).flatten()
-
-        # Calculate cvrmse and coverage of the HDI
-        partial_pool_mse = mean_squared_error(df.total_electricity[test_index], partial_pool_predictions)
-        partial_pool_rmse = sqrt(partial_pool_mse)
-        partial_pool_cvrmse = partial_pool_rmse / df.total_electricity.mean()
-        partial_pool_coverage = sum((partial_pool_lower_bound <= df.total_electricity[test_index]) & (
-                    df.total_electricity[test_index] <= partial_pool_higher_bound)) * 100 / len(test_index)
-
-        partial_pool_cvrmse_list.append(partial_pool_cvrmse)
-        partial_pool_coverage_list.append(partial_pool_coverage)
-
-        # No Pooling
-
-        with pm.Model(coords=coords) as no_pooling:
-            profile_cluster_idx = pm.Data("profile_cluster_idx", clusters[train_index], dims="obs_id")
-            daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
-            weekday = pm.Data("weekday", weekdays[train_index], dims="obs_id")
-
-            fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-            fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-            fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-
-            fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-            fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-            fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-
-            # cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
-            # heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
-            cooling_temp_lp = pm.Data("cooling_temp_lp", outdoor_temp_lp_c[train_index], dims="obs_id")
-            heating_temp_lp = pm.Data("heating_temp_lp", outdoor_temp_lp_h[train_index], dims="obs_id")
-
-            # Priors:
-            a_cluster = pm.Normal("a_cluster", mu=0.0, sigma=1.0, dims=("daypart", "profile_cluster"))
-            btclp = pm.Normal("btclp", mu=0.0, sigma=1.0, dims="daypart")
-            bthlp = pm.Normal("bthlp", mu=0.0, sigma=1.0, dims="daypart")
-
-            bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0, dims="profile_cluster")
-            bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0, dims="profile_cluster")
-            bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0, dims="profile_cluster")
-            bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0, dims="profile_cluster")
-            bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0, dims="profile_cluster")
-            bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0, dims="profile_cluster")
+    # With reuse_models each model is built and compiled once (3 compilations per building instead of 15):
+    # every fold only swaps the pm.Data arrays and refits from the initial approximation state
+
+    # Models compared (name -> ModelSpec), cross_validation_specs by default
+    if specs is None:
+        specs = cross_validation_specs
+
+    # likelihood="sufficient" fits the linear temperature models on the per fold Z'Z statistics instead of every
+    # training hour, the other models (balance temperature, minibatch) keep the observed likelihood
+    specs = {name: spec._replace(likelihood=likelihood)
+             if spec.temperature == "linear" and spec.minibatch is None else spec
+             for name, spec in specs.items()}
+
+    # conjugate=True draws the no and complete pooling baselines from their exact posterior instead of fitting ADVI
+    if conjugate:
+        specs = {name: spec._replace(inference="conjugate") if conjugate_supported(spec) else spec
+                 for name, spec in specs.items()}
+
+    # minibatch fits the variational models on minibatches of that many hours per step instead of every hour
+    specs = {name: minibatch_spec(spec, minibatch) for name, spec in specs.items()}
+
+    # Export column suffix -> summary key of the metrics averaged over the folds, with the fit telemetry
+    if metrics is None:
+        metrics = {'cvrmse': 'cvrmse', 'coverage': 'coverage'}
+    metrics = dict(metrics, **fit_metrics)
+
+    # warm_start initializes the variational fits of every fold from the approximation of the previous one (the
+    # training sets of two folds share 75% of their hours), so the folds have to run one after the other
+    warm_states = None
+    if warm_start:
+        if n_workers > 1:
+            raise ValueError("Warm started folds depend on the previous fold and cannot run in parallel")
+        warm_states = {name: {} for name in specs}
+
+    # Folds run one after the other, or with n_workers > 1 in parallel single threaded processes (see fold_executor,
+    # each worker compiles or loads its own models). Results come back in fold order either way
+    tasks = [(specs, coords, df.iloc[train_index], df.iloc[test_index], df.total_electricity.mean(), random_seed,
+              reuse_models, metrics, warm_states) for train_index, test_index in kf.split(df)]
+    folds = run_folds(evaluate_fold, tasks, n_workers)
 
-            # Expected value per county:
-            mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + \
-                 bs2[profile_cluster_idx] * fs_sin_2 + bs3[profile_cluster_idx] * fs_sin_3 + \
-                 bc1[profile_cluster_idx] * fs_cos_1 + bc2[profile_cluster_idx] * fs_cos_2 + \
-                 bc3[profile_cluster_idx] * fs_cos_3 + \
-                 btclp[daypart] * cooling_temp_lp + \
-                 bthlp[daypart] * heating_temp_lp
-            # btc[daypart] * cooling_temp + bth[daypart] * heating_temp + \
-
-            # Model error:
-            sigma = pm.Exponential("sigma", 1.0)
-
-            # Likelihood
-            y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
-
-        # Fitting
-
-        with no_pooling:
-            approx = pm.fit(n=50000,
-                            method='fullrank_advi',
-                            callbacks=[CheckParametersConvergence(tolerance=0.01)])
-            no_pooling_trace = approx.sample(1000)
-
-            # Sampling from the posterior setting test data to check the predictions on unseen data
-
-        with no_pooling:
-            pm.set_data(
-                {"profile_cluster_idx": clusters[test_index], "daypart": dayparts[test_index],  # "weekday":weekdays,
-                 "fs_sin_1": daypart_fs_sin_1[test_index], "fs_sin_2": daypart_fs_sin_2[test_index],
-                 "fs_sin_3": daypart_fs_sin_3[test_index],
-                 "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index],
-                 "fs_cos_3": daypart_fs_cos_3[test_index],
-                 # "cooling_temp":outdoor_temp_c, "heating_temp": outdoor_temp_h,
-                 "cooling_temp_lp": outdoor_temp_lp_c[test_index],
-                 "heating_temp_lp": outdoor_temp_lp_h[test_index]
-                 })
-
-            no_pool_posterior_hdi = pm.sample_posterior_predictive(no_pooling_trace, keep_size=True)
-            no_pool_posterior = pm.sample_posterior_predictive(no_pooling_trace)
-
-            no_pool_prior = pm.sample_prior_predictive(150)
-
-            # Calculate predictions and HDI
-
-        no_pool_predictions = np.exp(no_pool_posterior['y'].mean(0))
-        no_pool_hdi_data = az.hdi(no_pool_posterior_hdi)
-        no_pool_lower_bound = np.array(np.exp(no_pool_hdi_data.to_array().sel(hdi='lower'))).flatten()
-        no_pool_higher_bound = np.array(np.exp(no_pool_hdi_data.to_array().sel(hdi='higher'))).flatten()
-
-        # Calculate cvrmse and coverage of the HDI
-        no_pool_mse = mean_squared_error(df.total_electricity[test_index], no_pool_predictions)
-        no_pool_rmse = sqrt(no_pool_mse)
-        no_pool_cvrmse = no_pool_rmse / df.total_electricity.mean()
-        no_pool_coverage = sum((no_pool_lower_bound <= df.total_electricity[test_index]) & (
-                df.total_electricity[test_index] <= no_pool_higher_bound)) * 100 / len(test_index)
-
-        no_pool_cvrmse_list.append(no_pool_cvrmse)
-        no_pool_coverage_list.append(no_pool_coverage)
-
-        # Complete pooling
-
-        with pm.Model(coords=coords) as complete_pooling:
-
-            fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-            fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-            fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-
-            fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-            fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-            fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-
-            # cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
-            # heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
-            cooling_temp_lp = pm.Data("cooling_temp_lp", outdoor_temp_lp_c[train_index], dims="obs_id")
-            heating_temp_lp = pm.Data("heating_temp_lp", outdoor_temp_lp_h[train_index], dims="obs_id")
-
-            # Priors:
-            a = pm.Normal("a", mu=0.0, sigma=1.0)
-            btclp = pm.Normal("btclp", mu=0.0, sigma=1.0)
-            bthlp = pm.Normal("bthlp", mu=0.0, sigma=1.0)
-
-            bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0)
-            bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0)
-            bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0)
-            bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0)
-            bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0)
-            bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0)
-
-            # Expected value per county:
-            mu = a + bs1 * fs_sin_1 + bs2 * fs_sin_2 + bs3 * fs_sin_3 + bc1 * fs_cos_1 + bc2 * fs_cos_2 + \
-                 bc3 * fs_cos_3 + btclp * cooling_temp_lp + bthlp * heating_temp_lp
-            # btc[daypart] * cooling_temp + bth[daypart] * heating_temp + \
-
-            # Model error:
-            sigma = pm.Exponential("sigma", 1.0)
-
-            # Likelihood
-            y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
-
-        # Fitting
-
-        with complete_pooling:
-            approx = pm.fit(n=50000,
-                            method='fullrank_advi',
-                            callbacks=[CheckParametersConvergence(tolerance=0.01)])
-            complete_pooling_trace = approx.sample(1000)
-
-            # Sampling from the posterior setting test data to check the predictions on unseen data
-
-        with complete_pooling:
-            pm.set_data(
-                {"fs_sin_1": daypart_fs_sin_1[test_index], "fs_sin_2": daypart_fs_sin_2[test_index],
-                 "fs_sin_3": daypart_fs_sin_3[test_index],
-                 "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index],
-                 "fs_cos_3": daypart_fs_cos_3[test_index],
-                 # "cooling_temp":outdoor_temp_c, "heating_temp": outdoor_temp_h,
-                 "cooling_temp_lp": outdoor_temp_lp_c[test_index],
-                 "heating_temp_lp": outdoor_temp_lp_h[test_index]
-                 })
-
-            complete_pool_posterior_hdi = pm.sample_posterior_predictive(complete_pooling_trace, keep_size=True)
-            complete_pool_posterior = pm.sample_posterior_predictive(complete_pooling_trace)
-
-            complete_pool_prior = pm.sample_prior_predictive(150)
-
-            # Calculate predictions and HDI
-
-        complete_pool_predictions = np.exp(complete_pool_posterior['y'].mean(0))
-        complete_pool_hdi_data = az.hdi(complete_pool_posterior_hdi)
-        complete_pool_lower_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='lower'))).flatten()
-        complete_pool_higher_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='higher'))).flatten()
-
-        # Calculate cvrmse and coverage of the HDI
-        complete_pool_mse = mean_squared_error(df.total_electricity[test_index], complete_pool_predictions)
-        complete_pool_rmse = sqrt(complete_pool_mse)
-        complete_pool_cvrmse = complete_pool_rmse / df.total_electricity.mean()
-        complete_pool_coverage = sum((complete_pool_lower_bound <= df.total_electricity[test_index]) & (
-                df.total_electricity[test_index] <= complete_pool_higher_bound)) * 100 / len(test_index)
-
-        complete_pool_cvrmse_list.append(complete_pool_cvrmse)
-        complete_pool_coverage_list.append(complete_pool_coverage)
-
-    # Export Results
-    np_cvrmse = np.mean(no_pool_cvrmse_list)
-    cp_cvrmse = np.mean(complete_pool_cvrmse_list)
-    pp_cvrmse = np.mean(partial_pool_cvrmse_list)
-
-    np_coverage = np.mean(no_pool_coverage_list)
-    cp_coverage =  np.mean(complete_pool_coverage_list)
-    pp_coverage = np.mean(partial_pool_coverage_list)
+    # Create arrays to save model results
+    metric_lists = {(name, column): [fold_metrics[name, column] for fold_metrics in folds]
+                    for column in metrics for name in specs}
 
-    export_data = {'partial_pooling_cvrmse': [pp_cvrmse], 'no_pooling_cvrmse': [np_cvrmse], 'complete_pooling_cvrmse': [cp_cvrmse],
-                   'partial_pooling_coverage': [pp_coverage], 'no_pooling_coverage': [np_coverage], 'complete_pooling_coverage': [cp_coverage]}
+    # Export Results (the inference method only depends on the model size, it is the same in every fold)
+    export_data = {name + '_' + column: [values[0] if isinstance(values[0], str) else np.mean(values)]
+                   for (name, column), values in metric_lists.items()}
     export_df = pd.DataFrame(data=export_data)
     return export_df
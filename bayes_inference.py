@@ -0,0 +1,180 @@
+import time
+import numpy as np
+import pymc3 as pm
+from pymc3.variational.callbacks import CheckParametersConvergence
+from theano.compile.sharedvalue import SharedVariable
+
+inference_methods = {"advi": pm.ADVI, "fullrank_advi": pm.FullRankADVI}
+
+# "auto" picks full rank ADVI for models with at most fullrank_max_parameters free parameters and mean field ADVI
+# above: the full rank Cholesky factor has P(P + 1)/2 entries and costs O(P^3) per step, so models with many cluster x
+# daypart coefficients would dominate the run time (PyMC3 has no low rank plus diagonal approximation)
+variational_methods = ("auto", "advi", "fullrank_advi")
+fullrank_max_parameters = 250
+
+
+def choose_method(method, n_parameters):
+    # Variational method of inference_methods for a model with n_parameters free parameters
+    if method != "auto":
+        return method
+    return "fullrank_advi" if n_parameters <= fullrank_max_parameters else "advi"
+
+# Variational fits run for at most max_iterations and stop early at the first of (see early_stopping): relative change
+# of the approximation parameters below parameter_tolerance, mean loss of the last elbo_window iterations within
+# elbo_tolerance (relative) of the window before, or time_budget seconds (None for no limit)
+max_iterations = 50000
+parameter_tolerance = 0.01
+elbo_window = 1000
+elbo_tolerance = 1e-3
+time_budget = None
+
+
+def early_stopping(tolerance=parameter_tolerance, window=elbo_window, relative_elbo=elbo_tolerance, budget=time_budget,
+                   every=100):
+    # Callback combining CheckParametersConvergence with a smoothed ELBO plateau test and a wall clock budget, all
+    # checked every `every` iterations. The clock starts at the first iteration, after the compilation of pm.fit
+    parameters = CheckParametersConvergence(every=every, tolerance=tolerance)
+    start = []
+
+    def callback(approx, loss_hist, i):
+        if not start:
+            start.append(time.perf_counter())
+        parameters(approx, loss_hist, i)
+        if i % every:
+            return
+        if len(loss_hist) >= 2 * window:
+            previous = np.mean(loss_hist[-2 * window:-window])
+            current = np.mean(loss_hist[-window:])
+            if abs(previous - current) <= relative_elbo * abs(previous):
+                raise StopIteration("ELBO converged at iteration " + str(i))
+        if budget is not None and time.perf_counter() - start[0] > budget:
+            raise StopIteration("Time budget of " + str(budget) + " s reached at iteration " + str(i))
+
+    return callback
+
+
+def fit_telemetry(hist, seconds, method):
+    # Iterations run, final ELBO (smoothed over the last elbo_window iterations), seconds and inference method of a
+    # fit (NaN iterations and ELBO without a loss history, for NUTS and conjugate fits)
+    hist = np.asarray(hist)
+    if not len(hist):
+        return {"iterations": np.nan, "elbo": np.nan, "fit_seconds": seconds, "method": method}
+    return {"iterations": len(hist), "elbo": -np.mean(hist[-elbo_window:]), "fit_seconds": seconds, "method": method}
+
+
+def compile_inference(model, method="fullrank_advi", random_seed=None):
+    # Build the variational objective and compile its step function a single time
+    with model:
+        inference = inference_methods[choose_method(method, model.ndim)](random_seed=random_seed)
+        step_func = inference.objective.step_function(score=True)
+    return inference, step_func
+
+
+def fit_function(model, inference, step_func, random_seed=None):
+    # The returned fit() can be called again after pm.set_data has swapped the training arrays (e.g. for every CV
+    # fold): approximation parameters, optimizer accumulators and random streams are reset, so each call behaves
+    # like a fresh pm.fit. Must be created before the first fit (or right after unpickling a compiled inference)
+
+    # Snapshot every shared variable the step function updates, except the model data swapped between fits
+    data_vars = {id(var) for var in model.named_vars.values() if isinstance(var, SharedVariable)}
+    initial_state = [(var, var.get_value(borrow=False)) for var in step_func.get_shared()
+                     if id(var) not in data_vars]
+
+    def fit(n=max_iterations, callbacks=None, random_seed=random_seed, start=None):
+        # start: approximation state of an earlier fit to start from (see warm_start)
+        if callbacks is None:
+            callbacks = [early_stopping()]
+        for var, value in initial_state:
+            var.set_value(value, borrow=False)
+        # Reseeding puts the fit and approx.sample streams back where a freshly built approximation starts
+        if random_seed is not None:
+            for group in inference.approx.groups:
+                group._rng.seed(random_seed)
+        if start is not None:
+            warm_start(inference.approx, start)
+
+        inference.hist = np.asarray(())
+        with model:
+            inference.state = inference._iterate_with_loss(0, n, step_func, range(n), callbacks)
+        inference.approx.hist = inference.hist
+        return inference.approx
+
+    return fit
+
+
+def approximation_state(approx):
+    # Mean and scale of every free (transformed) variable of a variational approximation, by name: the standard
+    # deviations for mean field groups, the variable's lower triangular block of the Cholesky factor for full rank ones
+    state = {}
+    for group in approx.groups:
+        params = {name: param.get_value() for name, param in group.params_dict.items()}
+        if "L_tril" in params:
+            cholesky = np.zeros((len(params["mu"]), len(params["mu"])))
+            cholesky[np.tril_indices(len(cholesky))] = params["L_tril"]
+        for var_map in group.ordering.vmap:
+            if "L_tril" in params:
+                scale = cholesky[var_map.slc, var_map.slc]
+            else:
+                scale = np.logaddexp(0, params["rho"][var_map.slc])
+            state[var_map.var] = (tuple(var_map.shp), params["mu"][var_map.slc], scale)
+    return state
+
+
+def warm_start(approx, state):
+    # Initialize the approximation with the approximation_state of an earlier fit (the previous CV fold, or a nested
+    # model): the mean and scale of every variable found in state with the same name and shape, the other variables
+    # keep their initialization. Mean field scales and full rank blocks are converted into each other. Returns the
+    # names of the initialized variables
+    started = []
+    for group in approx.groups:
+        params = {name: param.get_value() for name, param in group.params_dict.items()}
+        if "L_tril" in params:
+            cholesky = np.zeros((len(params["mu"]), len(params["mu"])))
+            cholesky[np.tril_indices(len(cholesky))] = params["L_tril"]
+        for var_map in group.ordering.vmap:
+            if state.get(var_map.var, (None,))[0] != tuple(var_map.shp):
+                continue
+            shape, mu, scale = state[var_map.var]
+            params["mu"][var_map.slc] = mu
+            if "L_tril" in params:
+                cholesky[var_map.slc, :] = 0
+                cholesky[var_map.slc, var_map.slc] = scale if scale.ndim == 2 else np.diag(scale)
+            else:
+                sigma = scale if scale.ndim == 1 else np.sqrt(np.sum(scale ** 2, axis=1))
+                # Inverse of the softplus of the mean field rho
+                params["rho"][var_map.slc] = np.log(np.expm1(np.maximum(sigma, 1e-8)))
+            started.append(var_map.var)
+        if "L_tril" in params:
+            params["L_tril"] = cholesky[np.tril_indices(len(cholesky))]
+        for name, param in group.params_dict.items():
+            param.set_value(params[name].astype(param.dtype))
+    return started
+
+
+def warm_fit(method="fullrank_advi", state=None, n=max_iterations, callbacks=None, random_seed=None):
+    # pm.fit in the model context started from the approximation state of an earlier fit (see warm_start). The state
+    # dict is updated with the approximation of this fit, so that successive fits (folds, model variants) chain
+    if callbacks is None:
+        callbacks = [early_stopping()]
+    inference = inference_methods[choose_method(method, pm.modelcontext(None).ndim)](random_seed=random_seed)
+    if state:
+        warm_start(inference.approx, state)
+    approx = inference.fit(n, callbacks=callbacks)
+    approx.hist = inference.hist
+    if state is not None:
+        state.update(approximation_state(approx))
+    return approx
+
+
+def chained_state(warm_states, name, previous=None):
+    # Approximation state of the fit `name` in a chain of warm started fits (warm_states: name -> state), its state of
+    # the previous fold, on the first fold a copy of the state of the model fitted before it (previous)
+    state = warm_states.setdefault(name, {})
+    if not state and previous is not None:
+        state.update(warm_states.get(previous, {}))
+    return state
+
+
+def compile_fit(model, method="fullrank_advi", random_seed=None):
+    inference, step_func = compile_inference(model, method, random_seed)
+    return fit_function(model, inference, step_func, random_seed)
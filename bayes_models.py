@@ -0,0 +1,741 @@
+from collections import namedtuple
+import hashlib
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pymc3 as pm
+import theano
+import theano.tensor as tt
+
+from bayes_conjugate import conjugate_draws
+from bayes_inference import approximation_state, choose_method, compile_inference, fit_function, fit_telemetry, \
+    variational_methods, warm_fit
+from bayes_predictive import Term, linear_design, posterior_predictive_summary
+from core_budget import chain_cores, release_cores
+from fourier_features import fourier_columns, fourier_design
+
+# Specification of one log-consumption model y ~ Normal(mu, sigma):
+# pooling: "partial" (hyperpriors on intercept and Fourier slopes), "no" or "complete" (scalar coefficients)
+# priors: "normal" or "uniform" family of the non hierarchical intercept and Fourier slopes
+# intercept_dims: dims of a_cluster
+# fourier: Fourier sets of fourier_features, each with harmonics sine and cosine terms with slopes over profile_cluster
+# temperature: "balance" (btc/bth times the outdoor temperature beyond tbal_c/tbal_h, switched on by dep_c/dep_h)
+#              or "linear" (coefficients times the linear_temperatures features)
+# temperature_prior: "uniform", "halfnormal", "normal", "hierarchical_halfnormal" or "hierarchical_normal"
+# balance_prior: ("uniform", lower, upper) or ("normal", mu, sigma) of tbal_c/tbal_h
+# dependence: "threshold" (Uniform(0, 1) dep_c/dep_h active above 0.5), "bernoulli" or "marginal" (the Bernoulli
+#             dep_c/dep_h summed out of the likelihood, so that NUTS runs without a discrete Metropolis step, and drawn
+#             back from their posterior after the fit, see dependence_draws)
+# likelihood: "observed" (y over every hour) or "sufficient" (linear temperature only, the same likelihood from the
+#             statistics of sufficient_statistics, at a cost independent of the number of hours)
+# inference: "auto" (full rank or mean field ADVI by parameter count, see bayes_inference.choose_method),
+#            "fullrank_advi", "advi", "nuts" or "conjugate" (exact, for the linear specs with fixed Normal priors, see
+#            conjugate_supported), taking draws posterior samples
+# minibatch: None (every hour in every gradient step) or the number of hours drawn for each step (packed_minibatch)
+ModelSpec = namedtuple("ModelSpec", ["pooling", "priors", "intercept_dims", "fourier", "harmonics", "temperature",
+                                     "temperature_prior", "temperature_dims", "linear_temperatures", "balance_prior",
+                                     "balance_dims", "dependence", "dependence_dims", "likelihood", "inference",
+                                     "draws", "minibatch"],
+                       defaults=("no", "normal", ("profile_cluster",), ("daypart",), 3, "balance", "halfnormal",
+                                 ("daypart",), (), ("uniform", 8, 30), (), "threshold", ("profile_cluster",),
+                                 "observed", "auto", 5000, None))
+
+# Fields added after the first cached models and manifests, left out of spec_hash while unset so that the existing
+# keys stay valid
+optional_fields = ("minibatch",)
+
+# pm.Data name of the temperature features and their preprocessed column
+temperature_columns = {"outdoor_temp": "outdoor_temp",
+                       "cooling_temp": "outdoor_temp_c", "heating_temp": "outdoor_temp_h",
+                       "cooling_temp_lp": "outdoor_temp_lp_c", "heating_temp_lp": "outdoor_temp_lp_h"}
+
+# (dep_c, dep_h) of the terms of the marginal dependence mixture, each with prior probability 1/4 (Bernoulli(0.5))
+dependence_configurations = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+# Index data selecting the coefficient entry of every observation along each dim
+dim_index = {"profile_cluster": "profile_cluster_idx", "daypart": "daypart"}
+index_dims = {name: dim for dim, name in dim_index.items()}
+
+# Portfolio arrays of the model data, given per building instead of per observation
+building_data = ("building_site", "building_use")
+
+# Use type of the buildings in metadata.csv, pooled by the portfolio model
+use_column = "primaryspaceusage"
+
+# bayesian_model_comparison_test_1 ... _test_4
+test_1_spec = ModelSpec(priors="uniform", temperature_prior="uniform")
+test_2_spec = ModelSpec()
+test_3_spec = ModelSpec(fourier=("daypart", "yearpart"))
+test_4_specs = {"np_advi": ModelSpec(),
+                "pp_advi": ModelSpec(pooling="partial", temperature_prior="hierarchical_halfnormal"),
+                "cp_advi": ModelSpec(pooling="complete"),
+                "np_nuts": ModelSpec(dependence="marginal", inference="nuts", draws=1000),
+                "pp_nuts": ModelSpec(pooling="partial", temperature_prior="hierarchical_halfnormal",
+                                     dependence="marginal", inference="nuts", draws=1000),
+                "cp_nuts": ModelSpec(pooling="complete", dependence="marginal", inference="nuts", draws=1000)}
+
+# bayesian_model_comparison (cross validation)
+cross_validation_specs = {
+    "partial_pooling": ModelSpec(pooling="partial", intercept_dims=("daypart", "profile_cluster"),
+                                 temperature="linear", temperature_prior="normal",
+                                 linear_temperatures=(("btclp", "cooling_temp_lp"), ("bthlp", "heating_temp_lp")),
+                                 dependence=None, draws=1000),
+    "no_pooling": ModelSpec(intercept_dims=("daypart", "profile_cluster"), temperature="linear",
+                            temperature_prior="normal",
+                            linear_temperatures=(("btclp", "cooling_temp_lp"), ("bthlp", "heating_temp_lp")),
+                            dependence=None, draws=1000),
+    "complete_pooling": ModelSpec(pooling="complete", temperature="linear", temperature_prior="normal",
+                                  linear_temperatures=(("btclp", "cooling_temp_lp"), ("bthlp", "heating_temp_lp")),
+                                  dependence=None, draws=1000)}
+
+# bayesian_model_comparison (cross validation) of buildings from ashrae_preprocess.preprocess_building, which only
+# gives outdoor_temp (no low pass temperatures): the balance temperature ADVI models of test_4, named apart from the
+# linear cross_validation_specs so that their export columns do not mix with the results of those
+balance_cross_validation_specs = {"pp_balance": test_4_specs["pp_advi"], "np_balance": test_4_specs["np_advi"],
+                                  "cp_balance": test_4_specs["cp_advi"]}
+
+# bayesian_model_comparison_whole_year
+whole_year_temperatures = (("btclp", "cooling_temp_lp"), ("bthlp", "heating_temp_lp"),
+                           ("btc", "cooling_temp"), ("bth", "heating_temp"))
+whole_year_specs = {
+    "partial_pooling": ModelSpec(pooling="partial", temperature_prior="hierarchical_normal",
+                                 temperature_dims=("profile_cluster",), balance_prior=("normal", 18.0, 1.5),
+                                 balance_dims=("daypart",), dependence_dims=("daypart",), draws=1000),
+    "no_pooling": ModelSpec(temperature="linear", temperature_prior="normal", temperature_dims=("profile_cluster",),
+                            linear_temperatures=whole_year_temperatures, dependence=None, draws=1000),
+    "complete_pooling": ModelSpec(pooling="complete", temperature="linear", temperature_prior="normal",
+                                  linear_temperatures=whole_year_temperatures, dependence=None, draws=1000)}
+
+# bayesian_model_comparison_model_spec
+advi_dep_spec = ModelSpec(pooling="partial", temperature_prior="hierarchical_halfnormal",
+                          balance_prior=("uniform", 10, 25))
+
+# bayesian_model_comparison_portfolio: the partial pooling ADVI model of every building in one minibatch fit
+portfolio_spec = ModelSpec(pooling="partial", temperature_prior="hierarchical_halfnormal", inference="advi",
+                           draws=1000, minibatch=2000)
+
+# Models built and compiled in this process, see compiled_model
+compiled_models = {}
+
+# Directory of the persistent compiled model cache shared by all workers (None disables it)
+model_cache_dir = "/root/benedetto/results/model_cache/"
+
+# Part of the cache key, to bump whenever build_model changes the graph of existing specs
+model_version = 2
+
+# Chains of the NUTS specs
+nuts_chains = 4
+
+# Theano graphs are deeply nested, the default limit is too low to pickle them
+sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+
+def spec_hash(spec):
+    # Stable identifier of a spec, also across processes and runs
+    values = tuple(value for field, value in zip(spec._fields, spec)
+                   if not (field in optional_fields and value is None))
+    return hashlib.sha1(repr(values).encode()).hexdigest()[:12]
+
+
+def specs_hash(specs):
+    # Identifier of the results of named specs, changes with any of the specs and with the model version
+    key = (model_version, sorted((name, spec_hash(spec)) for name, spec in specs.items()))
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+
+
+def fourier_coords(spec):
+    # Columns of the "fourier" design matrix (fourier_features.fourier_design), the sets side by side in spec order
+    return [column for fourier_set in spec.fourier for column in fourier_columns(fourier_set + "_fs_", spec.harmonics)]
+
+
+def coefficient_dims(spec, dims):
+    return () if spec.pooling == "complete" else tuple(dims)
+
+
+def build_model(spec, coords, data):
+    # pm.Model of the spec. The pm.Data containers have no obs_id dims so that the same model (and its compiled
+    # functions) can be refitted on data of any length with pm.set_data. Sufficient likelihood specs take the
+    # fit_data statistics instead of the hourly arrays. With a "building" coord (batch_coords) the model is the batch
+    # of independent building models: every variable, hyperpriors included, gets a leading building dim and every
+    # observation selects the entries of its building (building_idx). With "site" and "use" coords as well
+    # (portfolio_coords) the buildings are pooled: the means of the partial pooling hyperpriors of every building are
+    # drawn around a portfolio mean plus the effects of its site and use type. minibatch specs fit on packed_minibatch
+    # draws of the observations
+    batched = "building" in coords
+    portfolio = "site" in coords
+
+    def prior(name, family, dims, **params):
+        if batched:
+            # Hyperpriors are (building,) vectors, broadcast along the other dims of the variable
+            params = {key: value.dimshuffle((0,) + ("x",) * len(dims)) if getattr(value, "ndim", 0) == 1 else value
+                      for key, value in params.items()}
+            dims = ("building",) + tuple(dims)
+        return getattr(pm, family)(name, dims=dims if dims else None, **params)
+
+    def indexed(variable, dims):
+        if batched:
+            return variable[(index["building"],) + tuple(index[dim] for dim in dims)]
+        if not dims:
+            return variable
+        return variable[tuple(index[dim] for dim in dims)]
+
+    def location(name):
+        # Mean hyperprior of a partially pooled group of coefficients
+        if not portfolio:
+            return prior(name, "Normal", (), mu=0.0, sigma=1.0)
+        site = pm.Normal(name + "_site", mu=0.0, sigma=pm.Exponential("sigma_" + name + "_site", 1.0),
+                         dims=("site",))
+        use = pm.Normal(name + "_use", mu=0.0, sigma=pm.Exponential("sigma_" + name + "_use", 1.0), dims=("use",))
+        mean = pm.Normal(name + "_portfolio", mu=0.0, sigma=1.0) + site[building_site] + use[building_use]
+        return prior(name, "Normal", (), mu=mean, sigma=pm.Exponential("sigma_" + name + "_building", 1.0))
+
+    def observations(name):
+        if batch is None:
+            return pm.Data(name, data[name])
+        return batch[name]
+
+    def temperature_coefficient(name, dims):
+        if spec.temperature_prior == "uniform":
+            return prior(name, "Uniform", dims, lower=-5, upper=5)
+        if spec.temperature_prior == "halfnormal":
+            return prior(name, "HalfNormal", dims, sigma=1)
+        if spec.temperature_prior == "normal":
+            return prior(name, "Normal", dims, mu=0.0, sigma=1.0)
+        sigma = prior("sigma_" + name, "Exponential", (), lam=1.0)
+        if spec.temperature_prior == "hierarchical_halfnormal":
+            return prior(name, "HalfNormal", dims, sigma=sigma)
+        mu = location("mu_" + name)
+        return prior(name, "Normal", dims, mu=mu, sigma=sigma)
+
+    intercept_dims = coefficient_dims(spec, spec.intercept_dims)
+    slope_dims = coefficient_dims(spec, ("profile_cluster",))
+    temperature_dims = coefficient_dims(spec, spec.temperature_dims)
+    dependence_dims = coefficient_dims(spec, spec.dependence_dims)
+    observed = spec.likelihood == "observed"
+    if not observed and spec.temperature != "linear":
+        raise ValueError("The sufficient statistics likelihood needs a linear temperature model")
+    if not observed and (batched or spec.minibatch is not None):
+        raise ValueError("Batched and minibatch models need the observed likelihood")
+    if portfolio and spec.pooling != "partial":
+        raise ValueError("The portfolio model pools the hyperpriors of the partial pooling model")
+    marginal = spec.temperature == "balance" and spec.dependence == "marginal"
+    if marginal and (not observed or batched or spec.minibatch is not None):
+        raise ValueError("The marginal dependence needs the observed likelihood of a single building")
+
+    coords = dict(coords, fourier=fourier_coords(spec))
+    with pm.Model(coords=coords) as model:
+        if observed:
+            batch = None if spec.minibatch is None else packed_minibatch(data, spec.minibatch)
+            index = {dim: observations(name) for dim, name in dim_index.items()}
+            if batched:
+                index["building"] = observations("building_idx")
+        if portfolio:
+            building_site = pm.Data("building_site", data["building_site"])
+            building_use = pm.Data("building_use", data["building_use"])
+
+        # Hyperpriors:
+        if spec.pooling == "partial":
+            bf = location("bf")
+            sigma_bf = prior("sigma_bf", "Exponential", (), lam=1.0)
+            a = location("a")
+            sigma_a = prior("sigma_a", "Exponential", (), lam=1.0)
+
+        # Intercept
+        if spec.pooling == "partial":
+            a_cluster = prior("a_cluster", "Normal", intercept_dims, mu=a, sigma=sigma_a)
+        elif spec.priors == "uniform":
+            a_cluster = prior("a_cluster", "Uniform", intercept_dims, lower=-100, upper=100)
+        else:
+            a_cluster = prior("a_cluster", "Normal", intercept_dims, mu=0.0, sigma=1.0)
+        if observed:
+            mu = indexed(a_cluster, intercept_dims)
+
+        # Fourier slopes: one (n_obs x K) design and one (profile_cluster x K) slope matrix, combined by a row-wise
+        # dot of the design rows and the slope rows of their clusters
+        if spec.fourier:
+            fourier_dims = slope_dims + ("fourier",)
+            if spec.pooling == "partial":
+                b_fourier = prior("b_fourier", "Normal", fourier_dims, mu=bf, sigma=sigma_bf)
+            elif spec.priors == "uniform":
+                b_fourier = prior("b_fourier", "Uniform", fourier_dims, lower=-5, upper=5)
+            else:
+                b_fourier = prior("b_fourier", "Normal", fourier_dims, mu=0.0, sigma=1.0)
+            if observed:
+                fourier = observations("fourier")
+                if slope_dims or batched:
+                    mu = mu + pm.math.sum(indexed(b_fourier, slope_dims) * fourier, axis=1)
+                else:
+                    mu = mu + pm.math.dot(fourier, b_fourier)
+
+        # Temperature
+        if spec.temperature == "balance":
+            outdoor_temp = observations("outdoor_temp")
+            btc = temperature_coefficient("btc", temperature_dims)
+            bth = temperature_coefficient("bth", temperature_dims)
+
+            # Balance temperatures
+            balance_family, first, second = spec.balance_prior
+            if balance_family == "uniform":
+                tbal_h = prior("tbal_h", "Uniform", spec.balance_dims, lower=first, upper=second)
+                tbal_c = prior("tbal_c", "Uniform", spec.balance_dims, lower=first, upper=second)
+            else:
+                tbal_h = prior("tbal_h", "Normal", spec.balance_dims, mu=first, sigma=second)
+                tbal_c = prior("tbal_c", "Normal", spec.balance_dims, mu=first, sigma=second)
+
+            cooling = outdoor_temp - indexed(tbal_c, spec.balance_dims)
+            heating = indexed(tbal_h, spec.balance_dims) - outdoor_temp
+            cooling_term = indexed(btc, temperature_dims) * cooling * (cooling > 0)
+            heating_term = indexed(bth, temperature_dims) * heating * (heating > 0)
+
+            # Dependence (marginal: in the likelihood)
+            if spec.dependence == "bernoulli":
+                dep_h = prior("dep_h", "Bernoulli", dependence_dims, p=0.5)
+                dep_c = prior("dep_c", "Bernoulli", dependence_dims, p=0.5)
+            elif not marginal:
+                dep_h = prior("dep_h", "Uniform", dependence_dims, lower=0, upper=1)
+                dep_c = prior("dep_c", "Uniform", dependence_dims, lower=0, upper=1)
+            if not marginal:
+                mu = mu + cooling_term * (indexed(dep_c, dependence_dims) > 0.5) + \
+                     heating_term * (indexed(dep_h, dependence_dims) > 0.5)
+        else:
+            for coef, feature in spec.linear_temperatures:
+                coefficient = temperature_coefficient(coef, temperature_dims)
+                if observed:
+                    mu = mu + indexed(coefficient, temperature_dims) * observations(feature)
+
+        # Model error:
+        sigma = prior("sigma", "Exponential", (), lam=1.0)
+
+        # Likelihood
+        if marginal:
+            # Mixture over the dependence configurations of every dep_c/dep_h entry (group): the log likelihood of the
+            # hours of the group under every configuration, summed out with logsumexp. dependence_logp keeps the
+            # (group x configuration) log posterior weights of every draw for dependence_draws
+            log_v = observations("log_v")
+            group = tt.zeros_like(index["profile_cluster"])
+            for dim in dependence_dims:
+                group = group * len(coords[dim]) + index[dim]
+            n_groups = int(np.prod([len(coords[dim]) for dim in dependence_dims]))
+            hour_logp = tt.stack([pm.Normal.dist(mu + cooling_on * cooling_term + heating_on * heating_term,
+                                                 sigma=sigma).logp(log_v)
+                                  for cooling_on, heating_on in dependence_configurations], axis=1)
+            group_logp = tt.inc_subtensor(tt.zeros((n_groups, len(dependence_configurations)))[group], hour_logp)
+            group_logp = pm.Deterministic("dependence_logp", group_logp - np.log(len(dependence_configurations)))
+            y = pm.Potential("y", pm.math.logsumexp(group_logp, axis=1).sum())
+        elif observed:
+            if batch is None:
+                y = pm.Normal("y", mu, sigma=indexed(sigma, ()), observed=observations("log_v"))
+            else:
+                y = pm.Normal("y", mu, sigma=indexed(sigma, ()), observed=batch["log_v"],
+                              total_size=len(data["log_v"]))
+        else:
+            sufficient_likelihood("y", [model[term.coef] for term in predictive_terms(spec)], sigma, data)
+
+    return model
+
+
+def packed_minibatch(data, batch_size, random_seed=42):
+    # Minibatches of the observation arrays of data drawn together: the arrays are packed side by side in one matrix
+    # with a single pm.Minibatch, so every step draws the same rows of all of them (separate pm.Minibatch objects
+    # draw different rows). Returns the batch of every array, integer (index) arrays cast back to integers
+    names = [name for name in data if name not in building_data]
+    columns = [np.reshape(data[name], (len(data[name]), -1)) for name in names]
+    packed = pm.Minibatch(np.concatenate(columns, axis=1).astype(theano.config.floatX), batch_size=batch_size,
+                          random_seed=random_seed)
+
+    batch = {}
+    offset = 0
+    for name, column in zip(names, columns):
+        width = column.shape[1]
+        batch[name] = packed[:, offset] if np.ndim(data[name]) == 1 else packed[:, offset:offset + width]
+        if np.issubdtype(np.asarray(data[name]).dtype, np.integer):
+            batch[name] = tt.cast(batch[name], "int64")
+        offset += width
+    return batch
+
+
+def model_data(df, spec):
+    # Arrays of the pm.Data containers of the spec from a preprocessed building dataframe
+    data = {"profile_cluster_idx": df.s.values, "daypart": df.daypart.values, "log_v": df.log_v.values}
+    if spec.fourier:
+        data["fourier"] = fourier_design(df.t, spec.fourier, spec.harmonics)
+    if spec.temperature == "balance":
+        data["outdoor_temp"] = df.outdoor_temp.values
+    else:
+        for coef, feature in spec.linear_temperatures:
+            data[feature] = df[temperature_columns[feature]].values
+    return data
+
+
+def coefficient_shapes(terms, coords, data):
+    # Shape of the coefficient of every term, from the coords sizes and the width of design matrix features
+    return {term.coef: tuple(len(coords[index_dims[name]]) for name in term.index) +
+                       (np.shape(data[term.feature])[1:] if term.feature is not None else ()) for term in terms}
+
+
+def design_statistics(terms, shapes, data):
+    # Statistics of the Gaussian likelihood of linear terms: with their one-hot design Z (theta the coefficients
+    # flattened in term order) ||y - Z theta||^2 = rss + (theta - theta_hat)' Z'Z (theta - theta_hat) for the least
+    # squares theta_hat, which is exact and better conditioned than y'y - 2 theta'Z'y + theta'Z'Z theta
+    design = linear_design(terms, shapes, data)
+    y = np.asarray(data["log_v"], dtype=np.float64)
+    theta_hat = np.linalg.lstsq(design, y, rcond=None)[0]
+    residuals = y - design @ theta_hat
+    return {"xtx": design.T @ design, "theta_hat": theta_hat, "rss": np.array(residuals @ residuals),
+            "n_obs": np.array(len(y), dtype=np.float64)}
+
+
+def sufficient_statistics(spec, coords, data):
+    terms = predictive_terms(spec)
+    return design_statistics(terms, coefficient_shapes(terms, coords, data), data)
+
+
+def sufficient_likelihood(name, coefficients, sigma, data):
+    # Potential of y ~ Normal(Z theta, sigma) from the design_statistics data, coefficients in term order. Its cost
+    # only depends on the number of coefficients, not on the number of hours
+    theta = tt.concatenate([tt.reshape(coefficient, (-1,)) for coefficient in coefficients])
+    delta = theta - pm.Data("theta_hat", data["theta_hat"])
+    squares = pm.Data("rss", data["rss"]) + tt.dot(delta, tt.dot(pm.Data("xtx", data["xtx"]), delta))
+    n_obs = pm.Data("n_obs", data["n_obs"])
+    return pm.Potential(name, -n_obs * (tt.log(sigma) + 0.5 * np.log(2 * np.pi)) - 0.5 * squares / sigma ** 2)
+
+
+def fit_data(spec, coords, data):
+    # pm.Data arrays the spec is fitted on (computed once per fold, before any iteration)
+    if spec.likelihood == "sufficient":
+        return sufficient_statistics(spec, coords, data)
+    return data
+
+
+def predictive_terms(spec):
+    # Terms of mu for bayes_predictive, matching the variables created by build_model
+    def index(dims):
+        return tuple(dim_index[dim] for dim in coefficient_dims(spec, dims))
+
+    terms = [Term("a_cluster", index(spec.intercept_dims))]
+    if spec.fourier:
+        terms.append(Term("b_fourier", index(("profile_cluster",)), "fourier"))
+    if spec.temperature == "balance":
+        balance_index = tuple(dim_index[dim] for dim in spec.balance_dims)
+        terms += [Term("btc", index(spec.temperature_dims), "outdoor_temp", "tbal_c", balance_index, "dep_c",
+                       index(spec.dependence_dims)),
+                  Term("bth", index(spec.temperature_dims), "outdoor_temp", "tbal_h", balance_index, "dep_h",
+                       index(spec.dependence_dims), heating=True)]
+    else:
+        terms += [Term(coef, index(spec.temperature_dims), feature) for coef, feature in spec.linear_temperatures]
+    return terms
+
+
+def conjugate_supported(spec):
+    # Linear specs whose coefficients all have Normal(0, 1) priors, the model of bayes_conjugate
+    return spec.temperature == "linear" and spec.pooling != "partial" and spec.priors == "normal" and \
+           spec.temperature_prior == "normal"
+
+
+def conjugate_trace(spec, coords, data, random_seed=None):
+    # Exact posterior draws of a conjugate_supported spec as a {variable: draws} trace, without a pm.Model
+    if not conjugate_supported(spec):
+        raise ValueError("The conjugate inference needs a linear spec with Normal(0, 1) priors")
+    terms = predictive_terms(spec)
+    shapes = coefficient_shapes(terms, coords, data)
+    theta, sigma = conjugate_draws(design_statistics(terms, shapes, data), spec.draws, random_seed=random_seed)
+    trace = {"sigma": sigma}
+    offset = 0
+    for term in terms:
+        size = int(np.prod(shapes[term.coef]))
+        trace[term.coef] = theta[:, offset:offset + size].reshape((spec.draws,) + shapes[term.coef])
+        offset += size
+    return trace
+
+
+def compile_model(spec, coords, data):
+    # Model of the spec and what its fit compiles: the variational (inference, step function) or the NUTS step
+    model = build_model(spec, coords, data)
+    if spec.inference == "nuts":
+        with model:
+            return model, pm.NUTS(target_accept=0.95)
+    return model, compile_inference(model, spec.inference)
+
+
+def model_cache_path(spec, coords):
+    # Compiled models only depend on the spec, the coords sizes and the float precision, not on the data length
+    key = "_".join([spec_hash(spec), str(len(coords["profile_cluster"])), str(len(coords["daypart"])),
+                    "v" + str(model_version), theano.config.floatX, pm.__version__])
+    if "building" in coords:
+        key += "_batch" + str(len(coords["building"]))
+    if "site" in coords:
+        key += "_portfolio" + str(len(coords["site"])) + "_" + str(len(coords["use"]))
+    return os.path.join(model_cache_dir, key + ".pkl")
+
+
+def load_compiled_model(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(e)
+        return None
+
+
+def save_compiled_model(path, compiled):
+    # Write to a temporary file first so that concurrent workers never read a partial pickle
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + "." + str(os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(e)
+
+
+def compiled_model(spec, coords, data):
+    # Model and compiled fit function (NUTS step for nuts specs) of the spec, built once per spec and coords sizes
+    # in this process. Later calls (other buildings, folds or sweeps) only swap the data, so they skip graph
+    # construction and compilation. With model_cache_dir the compiled model is also persisted, so other workers
+    # and later runs unpickle it instead of compiling
+    key = (spec, tuple((name, len(values)) for name, values in sorted(coords.items())))
+    if key not in compiled_models:
+        compiled = None
+        path = None
+        if model_cache_dir is not None:
+            path = model_cache_path(spec, coords)
+            if os.path.isfile(path):
+                compiled = load_compiled_model(path)
+        if compiled is None:
+            compiled = compile_model(spec, coords, data)
+            if path is not None:
+                save_compiled_model(path, compiled)
+        model, step = compiled
+        if spec.inference != "nuts":
+            step = fit_function(model, *step)
+        compiled_models[key] = (model, step)
+
+    model, step = compiled_models[key]
+    with model:
+        pm.set_data(data)
+    return model, step
+
+
+def warm_model_cache(specs, sizes):
+    # Compile and persist specs for every (n_clusters, n_dayparts) in sizes ahead of the building runs
+    for spec in specs:
+        for n_clusters, n_dayparts in sizes:
+            coords = {"profile_cluster": np.arange(n_clusters), "daypart": np.arange(n_dayparts)}
+            if spec.inference != "conjugate" and spec.minibatch is None:
+                compiled_model(spec, coords, fit_data(spec, coords, template_data(spec, n_clusters, n_dayparts)))
+
+
+def template_data(spec, n_clusters, n_dayparts):
+    # Placeholder data with every cluster and daypart, used to compile a model before any building is loaded
+    n = n_clusters * n_dayparts
+    df = pd.DataFrame({"s": np.repeat(np.arange(n_clusters), n_dayparts),
+                       "daypart": np.tile(np.arange(n_dayparts), n_clusters),
+                       "log_v": np.zeros(n),
+                       "t": pd.date_range("2016-01-01", periods=n, freq="h")})
+    for column in temperature_columns.values():
+        df[column] = np.zeros(n)
+    return model_data(df, spec)
+
+
+def chain_seeds(random_seed, chains):
+    # Seed of every NUTS chain derived from random_seed (None leaves the chains unseeded)
+    if random_seed is None:
+        return None
+    return [int(seed) for seed in np.random.SeedSequence(random_seed).generate_state(chains)]
+
+
+def building_seed(building_id):
+    # Random seed of the fits of a building, the same in every run
+    return int(hashlib.sha1(str(building_id).encode()).hexdigest()[:8], 16)
+
+
+def dependence_draws(trace, spec, coords, random_seed=None):
+    # {variable: draws} trace of a marginal dependence fit with dep_c and dep_h recovered: for every draw the posterior
+    # probability of each configuration of every dependence entry (the responsibilities of the mixture), dep_c/dep_h
+    # drawn from it with the shapes of the bernoulli model, and their probabilities as dep_c_probability and
+    # dep_h_probability (mean over the draws: posterior probability that the entry depends on the temperature)
+    draws = {name: np.asarray(trace[name]) for name in trace.varnames}
+    logp = draws.pop("dependence_logp")
+    probability = np.exp(logp - logp.max(axis=2, keepdims=True))
+    probability /= probability.sum(axis=2, keepdims=True)
+
+    rng = np.random.default_rng(random_seed)
+    configuration = np.argmax(probability.cumsum(axis=2) > rng.random(probability.shape[:2] + (1,)), axis=2)
+    configurations = np.array(dependence_configurations)
+    shape = (len(logp),) + tuple(len(coords[dim]) for dim in coefficient_dims(spec, spec.dependence_dims))
+    draws["dep_c"] = configurations[configuration, 0].reshape(shape)
+    draws["dep_h"] = configurations[configuration, 1].reshape(shape)
+    draws["dep_c_probability"] = probability[..., configurations[:, 0] == 1].sum(axis=2).reshape(shape)
+    draws["dep_h_probability"] = probability[..., configurations[:, 1] == 1].sum(axis=2).reshape(shape)
+    return draws
+
+
+def fit_spec(spec, coords, data, random_seed=None, reuse=True, warm_state=None):
+    # Posterior draws of the spec fitted on data and the telemetry of the fit (see bayes_inference.fit_telemetry).
+    # reuse=False builds a new model instead of the cached one. With a warm_state dict a variational fit starts from
+    # the approximation state it holds (see bayes_inference.warm_start) and updates it with its own
+    start = time.perf_counter()
+    if spec.inference == "conjugate":
+        trace = conjugate_trace(spec, coords, data, random_seed)
+        return trace, fit_telemetry((), time.perf_counter() - start, spec.inference)
+    data = fit_data(spec, coords, data)
+    # Minibatch models hold their data (and its size) in the pm.Minibatch, they are built for every fit
+    if reuse and spec.minibatch is None:
+        model, step = compiled_model(spec, coords, data)
+    else:
+        model, step = build_model(spec, coords, data), None
+
+    with model:
+        if spec.inference == "nuts":
+            if step is None:
+                step = pm.NUTS(target_accept=0.95)
+            # The chains run in parallel on the cores the building pool leaves free (see core_budget), with seeds
+            # that do not depend on how many cores they got
+            n_cores = chain_cores(nuts_chains)
+            start = time.perf_counter()
+            try:
+                trace = pm.sample(spec.draws, tune=2000, chains=nuts_chains, cores=n_cores, step=step,
+                                  random_seed=chain_seeds(random_seed, nuts_chains))
+            finally:
+                release_cores(n_cores - 1)
+            telemetry = fit_telemetry((), time.perf_counter() - start, spec.inference)
+            if spec.dependence == "marginal":
+                trace = dependence_draws(trace, spec, coords, random_seed)
+            return trace, telemetry
+        start = time.perf_counter()
+        if step is None:
+            approx = warm_fit(spec.inference, warm_state, random_seed=random_seed)
+        else:
+            approx = step(random_seed=random_seed, start=warm_state or None)
+            if warm_state is not None:
+                warm_state.update(approximation_state(approx))
+        telemetry = fit_telemetry(approx.hist, time.perf_counter() - start, choose_method(spec.inference, model.ndim))
+        trace = approx.sample(spec.draws)
+        if spec.dependence == "marginal":
+            trace = dependence_draws(trace, spec, coords, random_seed)
+        return trace, telemetry
+
+
+def evaluate_spec(spec, coords, train_df, test_df, mean_observed=None, random_seed=None, reuse=True, warm_state=None):
+    # Fit the spec on train_df and summarize its posterior predictive on test_df (see predictive_summary), with the
+    # telemetry of the fit added to the summary
+    trace, telemetry = fit_spec(spec, coords, model_data(train_df, spec), random_seed, reuse, warm_state)
+    summary = posterior_predictive_summary(trace, predictive_terms(spec), model_data(test_df, spec),
+                                           test_df.total_electricity.values, mean_observed=mean_observed,
+                                           random_seed=random_seed)
+    summary.update(telemetry)
+    return trace, summary
+
+
+def minibatch_spec(spec, batch_size):
+    # The spec fitted on minibatches of batch_size hours if it is variational with the observed likelihood (other
+    # specs are returned unchanged)
+    if batch_size is None or spec.inference not in variational_methods or spec.likelihood != "observed" or \
+            spec.dependence == "marginal":
+        return spec
+    return spec._replace(minibatch=batch_size)
+
+
+def batch_supported(spec):
+    # Specs that can be fitted as a batch of buildings in one variational fit
+    return spec.inference in variational_methods and spec.likelihood == "observed" and spec.dependence != "marginal"
+
+
+def batch_coords(building_coords, building_ids):
+    # Coords of the batched model of buildings with the model_coords building_coords: the cluster and daypart dims
+    # are nested within building, every building using the first entries of dims sized for the largest building
+    return {"building": list(building_ids),
+            "profile_cluster": np.arange(max(len(coords["profile_cluster"]) for coords in building_coords)),
+            "daypart": np.arange(max(len(coords["daypart"]) for coords in building_coords))}
+
+
+def portfolio_coords(building_coords, building_ids, metadata):
+    # Coords of the portfolio model (batch_coords with the sites and use types of the buildings) and the site and use
+    # of every building. The site is the prefix of the building id matching its weather, the use type comes from the
+    # metadata.csv dataframe
+    coords = batch_coords(building_coords, building_ids)
+    sites = [building_id[0:3] for building_id in building_ids]
+    uses = metadata.set_index("building_id")[use_column].reindex(building_ids).fillna("Unknown").astype(str)
+    coords["site"] = sorted(set(sites))
+    coords["use"] = sorted(set(uses))
+    data = {"building_site": np.searchsorted(coords["site"], sites),
+            "building_use": np.searchsorted(coords["use"], uses.values)}
+    return coords, data
+
+
+def batch_data(building_model_data):
+    # pm.Data arrays of the batched model: the model_data arrays of the buildings stacked, with the building of
+    # every observation
+    data = {name: np.concatenate([data[name] for data in building_model_data]) for name in building_model_data[0]}
+    data["building_idx"] = np.repeat(np.arange(len(building_model_data)),
+                                     [len(data["log_v"]) for data in building_model_data])
+    return data
+
+
+def split_batch_trace(trace, spec, building_coords):
+    # {variable: draws} trace of every building from the draws of the batched model, the variables of
+    # predictive_terms (and sigma) with the shapes of the single building model
+    variables = {"sigma": ()}
+    for term in predictive_terms(spec):
+        variables[term.coef] = term.index
+        if term.balance is not None:
+            variables[term.balance] = term.balance_index
+        if term.dependence is not None:
+            variables[term.dependence] = term.dependence_index
+
+    traces = []
+    for building, coords in enumerate(building_coords):
+        traces.append({name: np.asarray(trace[name])[(slice(None), building) +
+                                                     tuple(slice(len(coords[index_dims[i]])) for i in index)]
+                       for name, index in variables.items()})
+    return traces
+
+
+def evaluate_batch(spec, building_ids, train_dfs, test_dfs, random_seed=None, reuse=True, metadata=None):
+    # evaluate_spec of several buildings fitted together: one batched model and one variational fit instead of one
+    # per building, then the posterior predictive of every building from its own draws. With the metadata.csv
+    # dataframe the buildings are pooled in the portfolio model. Returns (trace, summary) of every building
+    if not batch_supported(spec):
+        raise ValueError("Only variational specs with the observed likelihood can be fitted as a batch")
+    building_coords = [model_coords(train_df) for train_df in train_dfs]
+    data = batch_data([model_data(train_df, spec) for train_df in train_dfs])
+    if metadata is None:
+        coords = batch_coords(building_coords, building_ids)
+    else:
+        coords, portfolio_data = portfolio_coords(building_coords, building_ids, metadata)
+        data.update(portfolio_data)
+    trace, telemetry = fit_spec(spec, coords, data, random_seed, reuse)
+
+    # Every building of the batch gets the telemetry of the shared fit
+    results = []
+    for building_trace, test_df in zip(split_batch_trace(trace, spec, building_coords), test_dfs):
+        summary = posterior_predictive_summary(building_trace, predictive_terms(spec), model_data(test_df, spec),
+                                               test_df.total_electricity.values, random_seed=random_seed)
+        summary.update(telemetry)
+        results.append((building_trace, summary))
+    return results
+
+
+def prepare_building(df):
+    # Log consumption and zero based cluster and weekday indices of a preprocessed building dataframe
+    df["log_v"] = np.log(df["total_electricity"]).values
+    df.t = pd.to_datetime(pd.Series(df.t))
+    df.s = df.s - 1
+    df.weekday = df.weekday - 1
+    return df
+
+
+def split_train_test(df):
+    # Create training and test set (for the ashrae data training is 2016, test is 2017)
+    train_df = df.loc[df["t"] <= pd.to_datetime("2017-01-01")]
+    test_df = df.loc[df["t"] > pd.to_datetime("2017-01-01")]
+    return train_df, test_df
+
+
+def model_coords(df):
+    return {"profile_cluster": df.s.unique(), "daypart": df.daypart.unique()}
@@ -0,0 +1,185 @@
+from collections import namedtuple
+
+import numpy as np
+
+# One additive term of mu = sum of indexed coefficients times features. coef is indexed by the data arrays named in
+# index (scalar coefficient if empty) and multiplies the feature array (intercept if None). A (hours x K) design
+# matrix feature takes a coefficient with a last axis of size K, giving the row-wise dot of the indexed coefficient
+# rows and the design rows. Terms with a balance temperature are the hinge terms
+# coef * max(feature - tbal, 0) * (dep > 0.5), or max(tbal - feature, 0) if heating
+Term = namedtuple("Term", ["coef", "index", "feature", "balance", "balance_index", "dependence", "dependence_index",
+                           "heating"], defaults=((), None, None, (), None, (), False))
+
+
+# Default cap in bytes of the draws x hours blocks of posterior_predictive_summary
+memory_budget = 64 * 2 ** 20
+
+
+def hdi_bounds(draws, hdi_prob=0.94):
+    # Narrowest interval holding hdi_prob of the draws for every column, same algorithm as az.hdi
+    n_draws = draws.shape[0]
+    sorted_draws = np.sort(draws, axis=0)
+    interval_idx_inc = int(np.floor(hdi_prob * n_draws))
+    n_intervals = n_draws - interval_idx_inc
+    interval_width = sorted_draws[interval_idx_inc:] - sorted_draws[:n_intervals]
+    if len(interval_width) == 0:
+        raise ValueError("Too few elements for interval calculation.")
+    min_idx = np.argmin(interval_width, axis=0)
+    columns = np.arange(sorted_draws.shape[1])
+    return sorted_draws[min_idx, columns], sorted_draws[min_idx + interval_idx_inc, columns]
+
+
+def predictive_metrics(predictions, lower_bound, higher_bound, observed, mean_observed=None):
+    # Accuracy and uncertainty metrics of a prediction on the original (not log) scale
+    observed = np.asarray(observed, dtype=float)
+    if mean_observed is None:
+        mean_observed = observed.mean()
+
+    # Calculate adjusted coverage
+    gamma = np.where(observed > higher_bound,
+                     1 + ((observed - higher_bound) / observed),
+                     np.where(observed < lower_bound,
+                              1 + ((lower_bound - observed) / observed),
+                              1))
+    adjusted_coverage = np.nanmean(gamma * higher_bound / lower_bound)
+
+    # Calculate cvrmse and coverage of the HDI
+    rmse = np.sqrt(np.mean((observed - predictions) ** 2))
+    cvrmse = rmse / mean_observed
+    coverage = np.sum((lower_bound <= observed) & (observed <= higher_bound)) * 100 / len(observed)
+    confidence_length = np.sum(higher_bound) - np.sum(lower_bound)
+
+    # Calculate NMBE
+    nmbe = np.sum(observed - predictions) * 100 / len(observed) / observed.mean()
+
+    return {'cvrmse': cvrmse, 'coverage': coverage, 'adjusted_coverage': adjusted_coverage,
+            'confidence_length': confidence_length, 'nmbe': nmbe}
+
+
+def predictive_summary(log_draws, observed, mean_observed=None, hdi_prob=0.94):
+    # Everything the evaluation needs from one posterior predictive sample of the log consumption
+    # (draws x hours): mean prediction, HDI bounds and metrics. mean_observed is the CV(RMSE) normalizer
+    # and defaults to the mean of the observed test values
+    log_draws = np.asarray(log_draws)
+    log_draws = log_draws.reshape(-1, log_draws.shape[-1])
+    log_lower_bound, log_higher_bound = hdi_bounds(log_draws, hdi_prob)
+    return bounds_summary(log_draws.mean(0), log_lower_bound, log_higher_bound, observed, mean_observed)
+
+
+def bounds_summary(log_mean, log_lower_bound, log_higher_bound, observed, mean_observed=None):
+    summary = {'prediction': np.exp(log_mean),
+               'lower_bound': np.exp(log_lower_bound),
+               'higher_bound': np.exp(log_higher_bound)}
+    summary.update(predictive_metrics(summary['prediction'], summary['lower_bound'], summary['higher_bound'],
+                                      observed, mean_observed))
+    return summary
+
+
+def gather_draws(draws, index, data):
+    # Posterior draws of a coefficient at every observation: (draws x hours), or (draws x 1) for a scalar
+    draws = np.asarray(draws)
+    if not index:
+        return draws.reshape(len(draws), 1)
+    return draws[(slice(None),) + tuple(np.asarray(data[name]) for name in index)]
+
+
+def linear_design(terms, shapes, data, dtype=np.float64):
+    # One-hot design Z of linear terms: the feature value of every observation in the column of the coefficient entry
+    # it selects, the coefficients (shapes by name) flattened in C order one after the other in term order
+    n_obs = len(next(iter(data.values())))
+    rows = np.arange(n_obs)
+    sizes = [int(np.prod(shapes[term.coef])) for term in terms]
+    design = np.zeros((n_obs, sum(sizes)), dtype=dtype)
+    offset = 0
+    for term, size in zip(terms, sizes):
+        feature = 1 if term.feature is None else np.asarray(data[term.feature])
+        if term.index:
+            shape = shapes[term.coef][:len(term.index)]
+            flat_index = np.ravel_multi_index(tuple(np.asarray(data[name]) for name in term.index), shape)
+        else:
+            flat_index = np.zeros(n_obs, dtype=int)
+        if np.ndim(feature) == 2:
+            # Design matrix: the K design values of every observation in the K columns of its coefficient row
+            width = feature.shape[1]
+            design[rows[:, None], offset + flat_index[:, None] * width + np.arange(width)] = feature
+        else:
+            design[rows, offset + flat_index] = feature
+        offset += size
+    return design
+
+
+def posterior_mu(trace, terms, data, dtype=np.float64):
+    # Expected log consumption for every posterior draw and observation in data (dict of pm.Data arrays)
+
+    # Linear terms in a single matrix product: theta (draws x parameters) @ Z.T (see linear_design)
+    linear = [term for term in terms if term.balance is None]
+    draws = [np.asarray(trace[term.coef]) for term in linear]
+    theta = np.concatenate([d.reshape(len(d), -1) for d in draws], axis=1).astype(dtype)
+    shapes = {term.coef: d.shape[1:] for term, d in zip(linear, draws)}
+    mu = theta @ linear_design(linear, shapes, data, dtype).T
+
+    # Balance temperature terms depend non-linearly on the tbal draws
+    for term in terms:
+        if term.balance is not None:
+            temperature = np.asarray(data[term.feature], dtype=dtype)[None, :]
+            tbal = gather_draws(trace[term.balance], term.balance_index, data).astype(dtype)
+            hinge = tbal - temperature if term.heating else temperature - tbal
+            np.maximum(hinge, 0, out=hinge)
+            hinge *= gather_draws(trace[term.coef], term.index, data)
+            if term.dependence is not None:
+                hinge *= gather_draws(trace[term.dependence], term.dependence_index, data) > 0.5
+            mu += hinge
+    return mu
+
+
+def posterior_mean_mu(trace, terms, data, dtype=np.float64):
+    # Expected log consumption at the posterior means of the variables (point prediction) for every observation
+    means = {name: np.mean(np.asarray(trace[name]), axis=0)[None] for name in term_variables(terms)}
+    return posterior_mu(means, terms, data, dtype)[0]
+
+
+def posterior_predictive(trace, terms, data, random_seed=None, dtype=np.float64):
+    # Posterior predictive draws of y ~ Normal(mu, sigma) computed in NumPy from the trace, without pm.set_data
+    # and sample_posterior_predictive. dtype=np.float32 halves the memory of the draws x hours array.
+    # random_seed can also be a np.random.Generator to continue an existing stream
+    mu = posterior_mu(trace, terms, data, dtype)
+    sigma = np.asarray(trace["sigma"], dtype=dtype)
+    rng = np.random.default_rng(random_seed)
+    mu += sigma[:, None] * rng.standard_normal(mu.shape, dtype=dtype)
+    return mu
+
+
+def term_variables(terms):
+    # Names of the posterior variables needed to evaluate the terms
+    names = {"sigma"}
+    for term in terms:
+        names.update(name for name in (term.coef, term.balance, term.dependence) if name is not None)
+    return names
+
+
+def posterior_predictive_summary(trace, terms, data, observed, mean_observed=None, hdi_prob=0.94,
+                                 random_seed=None, dtype=np.float64, max_bytes=None):
+    # predictive_summary of the posterior_predictive draws, computed over blocks of test hours so that the
+    # draws x hours arrays never grow beyond max_bytes (memory_budget by default) whatever the test period.
+    # Every hour still gets all its draws, so means and HDI bounds are exact
+    if max_bytes is None:
+        max_bytes = memory_budget
+    draws = {name: np.asarray(trace[name]) for name in term_variables(terms)}
+    data = {name: np.asarray(value) for name, value in data.items()}
+    n_draws = len(draws["sigma"])
+    n_obs = len(observed)
+
+    # mu, the hinge term temporaries and the sorted copy of the HDI are alive together
+    chunk_size = max(1, int(max_bytes // (5 * n_draws * np.dtype(dtype).itemsize)))
+    rng = np.random.default_rng(random_seed)
+
+    log_mean = np.empty(n_obs)
+    log_lower_bound = np.empty(n_obs)
+    log_higher_bound = np.empty(n_obs)
+    for start in range(0, n_obs, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        log_draws = posterior_predictive(draws, terms, {name: value[chunk] for name, value in data.items()},
+                                         random_seed=rng, dtype=dtype)
+        log_mean[chunk] = log_draws.mean(0)
+        log_lower_bound[chunk], log_higher_bound[chunk] = hdi_bounds(log_draws, hdi_prob)
+    return bounds_summary(log_mean, log_lower_bound, log_higher_bound, observed, mean_observed)
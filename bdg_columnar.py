@@ -0,0 +1,133 @@
+from collections import namedtuple
+import json
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columnar copy of the Building Data Genome 2 electricity_cleaned.csv and weather.csv, converted once with
+# convert_portfolio. Every building is a contiguous row of electricity.npy (buildings x hours) and every site a row of
+# temperature.npy (sites x hours) aligned on the electricity timestamps, both opened memory mapped, so loading a
+# building reads only its own row and the weather of its site, without the string scan of the weather table. index.json
+# maps building -> row, site -> row and building -> site (the first site starting with the 3 letters of the building)
+
+electricity_path = "/root/benedetto/data/bdg/electricity_cleaned.csv"
+weather_path = "/root/benedetto/data/bdg/weather.csv"
+columnar_dir = "/root/benedetto/data/bdg/columnar/"
+
+# For a pool of workers the arrays can also be copied once into shared memory blocks (share_portfolio) that the
+# workers attach to (attach_portfolio): every worker then reads zero copy views of the same RAM, without pickling and
+# without a copy of the dataset per process
+
+# Arrays of a portfolio, kept in shared memory by share_portfolio
+portfolio_arrays = ("timestamps", "electricity", "temperature")
+
+# site_cache: site -> temperature array, read once per site and process
+Portfolio = namedtuple("Portfolio", ["timestamps", "electricity", "temperature", "buildings", "sites",
+                                     "building_sites", "site_cache"])
+
+
+def convert_portfolio(electricity_path=electricity_path, weather_path=weather_path, directory=columnar_dir):
+    directory = os.path.expanduser(directory)
+    electricity = pd.read_csv(electricity_path)
+    weather = pd.read_csv(weather_path, usecols=['timestamp', 'site_id', 'airTemperature'])
+
+    buildings = [building for building in electricity.columns if building != 'timestamp']
+    temperature = weather.pivot_table(index='timestamp', columns='site_id', values='airTemperature', aggfunc='first')
+    temperature = temperature.reindex(electricity['timestamp'])
+    sites = [str(site) for site in temperature.columns]
+    building_sites = {building: next((site for site in sites if site.startswith(building[0:3])), None)
+                      for building in buildings}
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "timestamps.npy"), electricity['timestamp'].to_numpy(dtype=str))
+    np.save(os.path.join(directory, "electricity.npy"),
+            np.ascontiguousarray(electricity[buildings].to_numpy(dtype=float).T))
+    np.save(os.path.join(directory, "temperature.npy"), np.ascontiguousarray(temperature.to_numpy(dtype=float).T))
+
+    # The index is written last, a directory with an index is a complete conversion
+    index = {"buildings": {building: i for i, building in enumerate(buildings)},
+             "sites": {site: i for i, site in enumerate(sites)},
+             "building_sites": building_sites}
+    with open(os.path.join(directory, "index.json"), "w") as f:
+        json.dump(index, f)
+
+
+def open_portfolio(directory=columnar_dir, electricity_path=electricity_path, weather_path=weather_path):
+    # Memory mapped portfolio, converted from the csv files the first time
+    directory = os.path.expanduser(directory)
+    if not os.path.exists(os.path.join(directory, "index.json")):
+        convert_portfolio(electricity_path, weather_path, directory)
+
+    with open(os.path.join(directory, "index.json")) as f:
+        index = json.load(f)
+    return Portfolio(timestamps=np.load(os.path.join(directory, "timestamps.npy")),
+                     electricity=np.load(os.path.join(directory, "electricity.npy"), mmap_mode="r"),
+                     temperature=np.load(os.path.join(directory, "temperature.npy"), mmap_mode="r"),
+                     buildings=index["buildings"], sites=index["sites"], building_sites=index["building_sites"],
+                     site_cache={})
+
+
+def building_ids(portfolio, prefixes=None):
+    # Buildings of the portfolio, only those starting with prefixes (a string or tuple, e.g. a site) if given
+    if prefixes is None:
+        return list(portfolio.buildings)
+    return [building for building in portfolio.buildings if building.startswith(prefixes)]
+
+
+def site_temperature(portfolio, site):
+    if site not in portfolio.site_cache:
+        if site is None:
+            portfolio.site_cache[site] = np.full(len(portfolio.timestamps), np.nan)
+        else:
+            portfolio.site_cache[site] = np.asarray(portfolio.temperature[portfolio.sites[site]])
+    return portfolio.site_cache[site]
+
+
+def building_consumption(portfolio, building_id):
+    return portfolio.electricity[portfolio.buildings[building_id]]
+
+
+def building_temperature(portfolio, building_id):
+    return site_temperature(portfolio, portfolio.building_sites[building_id])
+
+
+def building_data(portfolio, building_id):
+    # Hourly consumption of the building with the air temperature of its site, the hours with both
+    df = pd.DataFrame({'timestamp': portfolio.timestamps,
+                       building_id: building_consumption(portfolio, building_id),
+                       'airTemperature': building_temperature(portfolio, building_id)})
+    return df.dropna()
+
+
+def share_portfolio(portfolio):
+    # Shared memory copy of the portfolio arrays. Returns the blocks, to close and unlink in the parent once the workers
+    # are done, and the description of the portfolio the workers attach to
+    blocks = []
+    arrays = {}
+    for name in portfolio_arrays:
+        array = getattr(portfolio, name)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        arrays[name] = (block.name, array.shape, array.dtype.str)
+
+    description = {"arrays": arrays, "buildings": portfolio.buildings, "sites": portfolio.sites,
+                   "building_sites": portfolio.building_sites}
+    return blocks, description
+
+
+def attach_portfolio(description):
+    # Portfolio of views on the shared memory blocks of share_portfolio. The blocks are returned with it and have to
+    # be kept open as long as the portfolio is used
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in description["arrays"].items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype, buffer=blocks[name].buf)
+        arrays[name].flags.writeable = False
+
+    portfolio = Portfolio(buildings=description["buildings"], sites=description["sites"],
+                          building_sites=description["building_sites"], site_cache={}, **arrays)
+    return blocks, portfolio
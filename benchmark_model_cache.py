@@ -0,0 +1,48 @@
+import tempfile
+import time
+
+import numpy as np
+
+import bayes_models
+from bayes_models import test_4_specs, compiled_model, template_data
+
+# Per building model overhead of the test_4 ADVI templates (no fitting): building and compiling every model from
+# scratch (what each pool worker paid before), unpickling it from the persistent cache (a new worker or run) and
+# swapping the data of the model already in memory (later buildings of the same worker)
+
+specs = {name: spec for name, spec in test_4_specs.items() if spec.inference != "nuts"}
+n_clusters = 4
+n_dayparts = 6
+n_buildings = 3
+
+bayes_models.model_cache_dir = tempfile.mkdtemp()
+coords = {"profile_cluster": np.arange(n_clusters), "daypart": np.arange(n_dayparts)}
+
+
+def building_overhead(spec):
+    data = template_data(spec, n_clusters, n_dayparts)
+    start = time.perf_counter()
+    compiled_model(spec, coords, data)
+    return time.perf_counter() - start
+
+
+results = {}
+for name, spec in specs.items():
+    # Cold: nothing cached, compile and persist
+    bayes_models.compiled_models.clear()
+    cold = building_overhead(spec)
+
+    # Disk: fresh process state, load the persisted model
+    disk = []
+    for i in range(n_buildings):
+        bayes_models.compiled_models.clear()
+        disk.append(building_overhead(spec))
+
+    # Memory: same worker, next buildings
+    memory = [building_overhead(spec) for i in range(n_buildings)]
+
+    results[name] = (cold, np.mean(disk), np.mean(memory))
+
+print("model         compile (s)   disk cache (s)   in memory (s)")
+for name, (cold, disk, memory) in results.items():
+    print(name.ljust(12), "%12.2f %16.2f %15.4f" % (cold, disk, memory))
@@ -0,0 +1,143 @@
+import concurrent.futures
+import hashlib
+import numpy as np
+import pandas as pd
+
+import bdg_columnar
+from core_budget import acquire_cores, attach_cores, core_counter, release_cores
+from bayes_functions_multiprocessing import multiprocessing_bayesian_comparison, \
+    multiprocessing_bayesian_comparison_batch
+
+# Buildings are sent to the workers by id only: every worker opens the columnar portfolio once (load_portfolio, or
+# attach_worker to a portfolio the parent put in shared memory) and builds the building df itself, and the pool hands
+# the next id to whichever worker is free, longest buildings first, so the long fits do not end up alone at the tail
+# of the run. The workers share the count of busy cores (core_budget) out of the n_cores of the pool (n_workers by
+# default), so that the NUTS chains of the last buildings run in parallel on the cores of the workers that ran out of
+# buildings. They run in a ProcessPoolExecutor, whose
+# workers (unlike the daemonic multiprocessing.Pool ones) can start the chain processes
+
+# Portfolio of the worker process (and its shared memory blocks), filled by load_portfolio or attach_worker
+worker = {}
+
+# Profile clusters assumed for buildings without a known cluster count
+default_clusters = 4
+
+
+def load_portfolio(directory=bdg_columnar.columnar_dir, busy=None, n_cores=None):
+    worker["portfolio"] = bdg_columnar.open_portfolio(directory)
+    if busy is not None:
+        attach_cores(busy, n_cores)
+
+
+def attach_worker(description, busy=None, n_cores=None):
+    worker["blocks"], worker["portfolio"] = bdg_columnar.attach_portfolio(description)
+    if busy is not None:
+        attach_cores(busy, n_cores)
+
+
+def building_costs(portfolio, building_ids, cluster_counts=None):
+    # Relative fitting cost of every building, longest first: the hours with both consumption and temperature
+    # (ADVI and prediction scale with the series length) times the profile clusters (partial pooling parameters).
+    # cluster_counts (building id -> clusters, results_store.cluster_counts of the earlier runs) gives the clusters of
+    # the buildings run before, the others count default_clusters
+    if cluster_counts is None:
+        cluster_counts = {}
+
+    costs = {}
+    for building_id in building_ids:
+        n_hours = np.sum(np.isfinite(bdg_columnar.building_consumption(portfolio, building_id)) &
+                         np.isfinite(bdg_columnar.building_temperature(portfolio, building_id)))
+        costs[building_id] = n_hours * (1 + cluster_counts.get(building_id, default_clusters))
+
+    return pd.Series(costs, dtype=float).sort_values(ascending=False, kind='stable')
+
+
+def building_hashes(portfolio, building_ids):
+    # Hash of the raw data of every building (timestamps, consumption and site temperatures), a building is run again
+    # when its data changes
+    # The timestamps are the same for every building, they are hashed once and the hasher copied per building
+    timestamps_hash = hashlib.sha1(portfolio.timestamps.tobytes())
+
+    hashes = {}
+    for building_id in building_ids:
+        data_hash = timestamps_hash.copy()
+        data_hash.update(np.ascontiguousarray(bdg_columnar.building_consumption(portfolio, building_id)).tobytes())
+        data_hash.update(np.ascontiguousarray(bdg_columnar.building_temperature(portfolio, building_id)).tobytes())
+        hashes[building_id] = data_hash.hexdigest()[:12]
+    return hashes
+
+
+def outstanding_buildings(building_ids, manifest, spec_hash, data_hashes, retry_failed=False):
+    # Buildings without a manifest entry for the current specs and data. Failed buildings are only run again with
+    # retry_failed, with unchanged specs and data they would fail the same way
+    outstanding = []
+    for building_id in building_ids:
+        entry = manifest.get(building_id)
+        if entry is None or entry[:2] != (spec_hash, data_hashes[building_id]) or \
+                (retry_failed and entry[2] != 'done'):
+            outstanding.append(building_id)
+    return outstanding
+
+
+def run_building(building_id):
+    # The manifest already decided that the building is outstanding, existing results are replaced. The worker holds
+    # its own core while it runs
+    acquire_cores(1, minimum=1)
+    try:
+        df = bdg_columnar.building_data(worker["portfolio"], building_id)
+        return building_id, multiprocessing_bayesian_comparison(df, skip_existing=False)
+    finally:
+        release_cores(1)
+
+
+def run_batch(building_ids):
+    # Buildings modelled together in one batched fit, see multiprocessing_bayesian_comparison_batch
+    acquire_cores(1, minimum=1)
+    try:
+        dfs = [bdg_columnar.building_data(worker["portfolio"], building_id) for building_id in building_ids]
+        return list(multiprocessing_bayesian_comparison_batch(dfs).items())
+    finally:
+        release_cores(1)
+
+
+def run_buildings(building_ids, n_workers=8, directory=bdg_columnar.columnar_dir, portfolio=None, batch_size=1,
+                  n_cores=None):
+    # Model the buildings in order of building_ids (longest first from building_costs) in a pool of n_workers,
+    # one id at a time per worker. Yields (building id, status) as the buildings finish. With a portfolio, its arrays
+    # are shared with the workers through shared memory, else every worker memory maps the columnar directory.
+    # batch_size > 1 fits consecutive buildings (of similar cost) together in batched models. n_cores is the core
+    # budget of the pool shared with the NUTS chains, n_workers by default: the chains only go parallel on the cores
+    # of idle workers, raise it to also give them cores of the machine the pool does not use
+    building_ids = list(building_ids)
+    if not building_ids:
+        return
+    if batch_size > 1:
+        function = run_batch
+        tasks = [building_ids[i:i + batch_size] for i in range(0, len(building_ids), batch_size)]
+    else:
+        function = run_building
+        tasks = building_ids
+
+    if n_cores is None:
+        n_cores = n_workers
+    busy = core_counter()
+    blocks = []
+    if portfolio is None:
+        initializer, initargs = load_portfolio, (directory, busy, n_cores)
+    else:
+        blocks, description = bdg_columnar.share_portfolio(portfolio)
+        initializer, initargs = attach_worker, (description, busy, n_cores)
+
+    # The executor hands the tasks to the workers in submission order as they become free
+    try:
+        with concurrent.futures.ProcessPoolExecutor(n_workers, initializer=initializer, initargs=initargs) as pool:
+            futures = [pool.submit(function, task) for task in tasks]
+            for future in concurrent.futures.as_completed(futures):
+                if batch_size > 1:
+                    yield from future.result()
+                else:
+                    yield future.result()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,53 @@
+import multiprocessing
+import warnings
+
+# Core budget of the building pool (one core per worker unless the pool is given more) shared by its workers. Every
+# worker holds one core while it runs a building and can claim the cores no other worker is using for the NUTS chains
+# of its models: while the queue is full every core of the budget is busy and the chains run one after the other,
+# once it drains the cores of the idle workers run them in parallel. The count of busy cores is a multiprocessing.Value
+# created by the parent and attached by every worker
+
+# "busy": multiprocessing.Value of the cores in use by the pool, "total": core budget of the pool. Empty outside a pool
+cores = {}
+
+# Whether the daemonic worker warning of chain_cores was given in this process
+warned = []
+
+
+def core_counter():
+    return multiprocessing.Value("i", 0)
+
+
+def attach_cores(busy, total):
+    cores["busy"] = busy
+    cores["total"] = total
+
+
+def acquire_cores(n, minimum=0):
+    # Claim up to n free cores (at least minimum, even if the pool is oversubscribed) and return how many were claimed.
+    # Outside a pool nothing is counted and minimum is returned
+    if not cores:
+        return minimum
+    with cores["busy"].get_lock():
+        claimed = max(minimum, min(n, cores["total"] - cores["busy"].value))
+        cores["busy"].value += claimed
+    return claimed
+
+
+def release_cores(n):
+    if cores and n:
+        with cores["busy"].get_lock():
+            cores["busy"].value -= n
+
+
+def chain_cores(chains):
+    # Cores for the chains of one NUTS run: the core of the process and up to chains - 1 free ones, the extra ones are
+    # given back with release_cores(cores - 1). Daemonic processes cannot start the chain processes and sample on their
+    # own core: multiprocessing.Pool workers, and ProcessPoolExecutor workers before Python 3.9 (warned once)
+    if multiprocessing.current_process().daemon:
+        if cores and not warned:
+            warnings.warn("Daemonic pool worker (ProcessPoolExecutor before Python 3.9), the NUTS chains run on one "
+                          "core")
+            warned.append(True)
+        return 1
+    return 1 + acquire_cores(chains - 1)
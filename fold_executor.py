@@ -0,0 +1,35 @@
+import multiprocessing
+import os
+
+# Cross validation folds are independent, so they can run in a process pool. Every worker is pinned to one
+# BLAS/OpenMP thread (and Theano without OpenMP) so that n_workers processes use n_workers cores instead of
+# oversubscribing them. The pool uses spawn workers that inherit the environment at start, so the limits are in place
+# before the workers load numpy and theano (a forked worker would keep the thread pools of the parent). Scripts
+# using it must keep their fold loop under if __name__ == "__main__"
+
+single_thread_env = {"OMP_NUM_THREADS": "1", "MKL_NUM_THREADS": "1", "OPENBLAS_NUM_THREADS": "1",
+                     "NUMEXPR_NUM_THREADS": "1", "VECLIB_MAXIMUM_THREADS": "1"}
+
+
+def single_thread_pool(n_workers):
+    saved = {name: os.environ.get(name) for name in list(single_thread_env) + ["THEANO_FLAGS"]}
+    os.environ.update(single_thread_env)
+    os.environ["THEANO_FLAGS"] = ",".join(flag for flag in (saved["THEANO_FLAGS"], "openmp=False") if flag)
+    try:
+        return multiprocessing.get_context("spawn").Pool(n_workers)
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_folds(function, tasks, n_workers=1):
+    # function applied to every fold task, in a pool of n_workers single threaded processes when n_workers > 1.
+    # Results are returned in task order whatever order the folds finish in, so merging them is deterministic
+    tasks = list(tasks)
+    if n_workers <= 1 or len(tasks) <= 1:
+        return [function(task) for task in tasks]
+    with single_thread_pool(min(n_workers, len(tasks))) as pool:
+        return pool.map(function, tasks, chunksize=1)
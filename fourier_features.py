@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# Fourier terms of the models (add_fs_daypart and add_fs_yearpart of preprocessing/functions_updated.R). They only
+# depend on the hour of the day and the hour of the year, so every basis is tabulated once and the design matrix of
+# any timestamps is an integer gather of the table rows
+
+# Fourier set: (number of table rows, period in hours)
+fourier_periods = {"daypart": (24, 24),
+                   "yearpart": (366 * 24, 24 * 365)}
+
+# Basis tables already built, by (fourier set, harmonics, dtype)
+basis_tables = {}
+
+
+def fourier_columns(prefix, harmonics=3):
+    # Column names of a Fourier set in table order: sin_1, cos_1, ..., sin_n, cos_n
+    return [prefix + part + "_" + str(i) for i in range(1, harmonics + 1) for part in ("sin", "cos")]
+
+
+def basis_table(fourier_set, harmonics=3, dtype=np.float32):
+    # (rows x 2 * harmonics) table of the set, row i is the basis at hour i of the day (of the year)
+    key = (fourier_set, harmonics, np.dtype(dtype))
+    if key not in basis_tables:
+        n_rows, period = fourier_periods[fourier_set]
+        x = np.arange(n_rows)[:, None] / period * 2 * np.pi * np.arange(1, harmonics + 1)[None, :]
+        table = np.empty((n_rows, 2 * harmonics), dtype=dtype)
+        table[:, 0::2] = np.sin(x)
+        table[:, 1::2] = np.cos(x)
+        table.setflags(write=False)
+        basis_tables[key] = table
+    return basis_tables[key]
+
+
+def basis_index(fourier_set, times):
+    times = pd.DatetimeIndex(times)
+    if fourier_set == "daypart":
+        return np.asarray(times.hour)
+    return np.asarray((times.dayofyear - 1) * 24 + times.hour)
+
+
+def fourier_design(times, fourier_sets=("daypart",), harmonics=3, dtype=np.float32):
+    # Contiguous (n x 2 * harmonics * len(fourier_sets)) design of the timestamps, sets side by side
+    width = 2 * harmonics
+    design = np.empty((len(times), width * len(fourier_sets)), dtype=dtype)
+    for i, fourier_set in enumerate(fourier_sets):
+        np.take(basis_table(fourier_set, harmonics, dtype), basis_index(fourier_set, times), axis=0,
+                out=design[:, i * width:(i + 1) * width])
+    return design
+
+
+def fourier_frame(times, fourier_sets=("daypart",), harmonics=3, dtype=np.float32):
+    # fourier_design as named daypart_fs_* / yearpart_fs_* columns
+    columns = [column for fourier_set in fourier_sets for column in fourier_columns(fourier_set + "_fs_", harmonics)]
+    return pd.DataFrame(fourier_design(times, fourier_sets, harmonics, dtype), columns=columns,
+                        index=getattr(times, "index", None))
@@ -11,6 +11,8 @@ import warnings
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import KFold
 from math import sqrt
+from fourier_features import fourier_columns
+from bayes_inference import chained_state, warm_fit
 # Optimize with 5 fold CV which variables should be pooled on and which not
 # Run different models and save the accuracy to a DF, finally write the DF in a csv.
 # Also save graphs for each model in the folder
@@ -50,16 +52,8 @@ n_hours = len(df.index)
 temperature = df.outdoor_temp
 outdoor_temp_c = df.outdoor_temp_c
 outdoor_temp_h = df.outdoor_temp_h
-daypart_fs_sin_1 = df.daypart_fs_sin_1
-daypart_fs_sin_2 = df.daypart_fs_sin_2
-daypart_fs_sin_3 = df.daypart_fs_sin_3
-daypart_fs_sin_4 = df.daypart_fs_sin_4
-daypart_fs_sin_5 = df.daypart_fs_sin_5
-daypart_fs_cos_1 = df.daypart_fs_cos_1
-daypart_fs_cos_2 = df.daypart_fs_cos_2
-daypart_fs_cos_3 = df.daypart_fs_cos_3
-daypart_fs_cos_4 = df.daypart_fs_cos_4
-daypart_fs_cos_5 = df.daypart_fs_cos_5
+fourier_names = fourier_columns("daypart_fs_", 5)
+daypart_fs = df[fourier_names]
 
 
 # CROSS VALIDATION
@@ -85,11 +79,16 @@ waic = []
 model_name = []
 coverage = []
 
+# Every model starts ADVI from its approximation of the previous fold (on the first fold from the previous model,
+# matched by parameter name and shape, see bayes_inference.warm_start)
+warm_states = {}
+
 for train_index, test_index in kf.split(df):
 
     # Coords
     coords = {"obs_id": np.arange(temperature[train_index].size)}
     coords["profile_cluster"] = unique_clusters
+    coords["fourier"] = fourier_names
     coords["heat_cluster"] = unique_heat_clusters
     coords["cool_cluster"] = unique_cool_clusters
     coords["daypart"] = unique_dayparts
@@ -103,16 +102,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -122,24 +112,10 @@ for train_index, test_index in kf.split(df):
         btc = pm.Normal("btc", mu=0.0, sigma=1.0, dims=("daypart", "cool_cluster"))
         bth = pm.Normal("bth", mu=0.0, sigma=1.0, dims=("daypart", "heat_cluster"))
 
-        bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=0.0, sigma=1.0, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=0.0, sigma=1.0, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + \
-             bs2[profile_cluster_idx] * fs_sin_2 + bs3[profile_cluster_idx] * fs_sin_3 + \
-             bs4[profile_cluster_idx] * fs_sin_4 + bs5[profile_cluster_idx] * fs_sin_5 + \
-             bc1[profile_cluster_idx] * fs_cos_1 + bc2[profile_cluster_idx] * fs_cos_2 + \
-             bc3[profile_cluster_idx] * fs_cos_3 + bc4[profile_cluster_idx] * fs_cos_4 + \
-             bc5[profile_cluster_idx] * fs_cos_5 + btc[daypart, cool_temp_cluster_idx] * cooling_temp + \
+        mu = a[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + btc[daypart, cool_temp_cluster_idx] * cooling_temp + \
              bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -149,25 +125,16 @@ for train_index, test_index in kf.split(df):
         y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims='obs_id')
 
     # advi fitting
-        approx = pm.fit(n=50000,
-                        method='fullrank_advi',
-                        callbacks=[CheckParametersConvergence(tolerance=0.01)])
+        approx = warm_fit('auto', chained_state(warm_states, "model_1", None),
+                          n=50000,
+                          callbacks=[CheckParametersConvergence(tolerance=0.01)])
         model_1_trace = approx.sample(1000)
         model_1_idata = az.from_pymc3(model_1_trace)
         az.plot_trace(model_1_idata)
         plt.save('results/plots/model_1_trace.png')
 
     model_1_a_means = np.mean(model_1_trace['a'], axis=0)
-    model_1_bs1_means = np.mean(model_1_trace['bs1'], axis=0)
-    model_1_bs2_means = np.mean(model_1_trace['bs2'], axis=0)
-    model_1_bs3_means = np.mean(model_1_trace['bs3'], axis=0)
-    model_1_bs4_means = np.mean(model_1_trace['bs4'], axis=0)
-    model_1_bs5_means = np.mean(model_1_trace['bs5'], axis=0)
-    model_1_bc1_means = np.mean(model_1_trace['bc1'], axis=0)
-    model_1_bc2_means = np.mean(model_1_trace['bc2'], axis=0)
-    model_1_bc3_means = np.mean(model_1_trace['bc3'], axis=0)
-    model_1_bc4_means = np.mean(model_1_trace['bc4'], axis=0)
-    model_1_bc5_means = np.mean(model_1_trace['bc5'], axis=0)
+    model_1_b_fourier_means = np.mean(model_1_trace['b_fourier'], axis=0)
 
     model_1_bth_means = np.mean(model_1_trace['bth'], axis=0)
     model_1_btc_means = np.mean(model_1_trace['btc'], axis=0)
@@ -188,26 +155,7 @@ for train_index, test_index in kf.split(df):
                                 for daypart_idx in unique_dayparts:
                                     if dayparts[hour] == daypart_idx:
                                         model_1_log_predictions.append(model_1_a_means[daypart_idx, cluster_idx] + \
-                                                                      model_1_bs1_means[cluster_idx] *
-                                                                      daypart_fs_sin_1[hour] + \
-                                                                      model_1_bs2_means[cluster_idx] *
-                                                                      daypart_fs_sin_2[hour] + \
-                                                                      model_1_bs3_means[cluster_idx] *
-                                                                      daypart_fs_sin_3[hour] + \
-                                                                      model_1_bs4_means[cluster_idx] *
-                                                                      daypart_fs_sin_4[hour] + \
-                                                                      model_1_bs5_means[cluster_idx] *
-                                                                      daypart_fs_sin_5[hour] + \
-                                                                      model_1_bc1_means[cluster_idx] *
-                                                                      daypart_fs_cos_1[hour] + \
-                                                                      model_1_bc2_means[cluster_idx] *
-                                                                      daypart_fs_cos_2[hour] + \
-                                                                      model_1_bc3_means[cluster_idx] *
-                                                                      daypart_fs_cos_3[hour] + \
-                                                                      model_1_bc4_means[cluster_idx] *
-                                                                      daypart_fs_cos_4[hour] + \
-                                                                      model_1_bc5_means[cluster_idx] *
-                                                                      daypart_fs_cos_5[hour] + \
+                                                                      np.dot(model_1_b_fourier_means[cluster_idx], daypart_fs.loc[hour]) + \
                                                                       model_1_bth_means[
                                                                           daypart_idx, heat_cluster_idx] *
                                                                       outdoor_temp_h[hour] + \
@@ -218,26 +166,7 @@ for train_index, test_index in kf.split(df):
                                         model_1_lower_log.append(
                                             model_1_hdi['a'][daypart_idx, cluster_idx].sel(
                                                 hdi='lower').values + \
-                                            model_1_hdi['bs1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_1_hdi['bs2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_1_hdi['bs3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_1_hdi['bs4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_1_hdi['bs5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_1_hdi['bc1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_1_hdi['bc2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_1_hdi['bc3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_1_hdi['bc4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_1_hdi['bc5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_1_hdi['b_fourier'][cluster_idx].sel(hdi='lower').values, daypart_fs.loc[hour]) + \
                                             model_1_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='lower').values * outdoor_temp_h[hour] + \
                                             model_1_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -247,26 +176,7 @@ for train_index, test_index in kf.split(df):
                                         model_1_higher_log.append(
                                             model_1_hdi['a'][daypart_idx, cluster_idx].sel(
                                                 hdi='higher').values + \
-                                            model_1_hdi['bs1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_1_hdi['bs2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_1_hdi['bs3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_1_hdi['bs4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_1_hdi['bs5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_1_hdi['bc1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_1_hdi['bc2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_1_hdi['bc3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_1_hdi['bc4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_1_hdi['bc5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_1_hdi['b_fourier'][cluster_idx].sel(hdi='higher').values, daypart_fs.loc[hour]) + \
                                             model_1_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='higher').values * outdoor_temp_h[hour] + \
                                             model_1_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -298,16 +208,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -325,24 +226,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart", "profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -350,9 +237,9 @@ for train_index, test_index in kf.split(df):
 
         y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
 
-        approx = pm.fit(n=50000,
-                        method='fullrank_advi',
-                        callbacks=[CheckParametersConvergence(tolerance=0.01)])
+        approx = warm_fit('auto', chained_state(warm_states, "model_2", "model_1"),
+                          n=50000,
+                          callbacks=[CheckParametersConvergence(tolerance=0.01)])
         model_2_trace = approx.sample(1000)
         model_2_idata = az.from_pymc3(model_2_trace)
         az.plot_trace(model_2_idata)
@@ -360,16 +247,7 @@ for train_index, test_index in kf.split(df):
 
     # Calculate predictions
     model_2_acluster_means = np.mean(model_2_trace['a_cluster'], axis=0)
-    model_2_bs1_means = np.mean(model_2_trace['bs1'], axis=0)
-    model_2_bs2_means = np.mean(model_2_trace['bs2'], axis=0)
-    model_2_bs3_means = np.mean(model_2_trace['bs3'], axis=0)
-    model_2_bs4_means = np.mean(model_2_trace['bs4'], axis=0)
-    model_2_bs5_means = np.mean(model_2_trace['bs5'], axis=0)
-    model_2_bc1_means = np.mean(model_2_trace['bc1'], axis=0)
-    model_2_bc2_means = np.mean(model_2_trace['bc2'], axis=0)
-    model_2_bc3_means = np.mean(model_2_trace['bc3'], axis=0)
-    model_2_bc4_means = np.mean(model_2_trace['bc4'], axis=0)
-    model_2_bc5_means = np.mean(model_2_trace['bc5'], axis=0)
+    model_2_b_fourier_means = np.mean(model_2_trace['b_fourier'], axis=0)
 
     model_2_bth_means = np.mean(model_2_trace['bth'], axis=0)
     model_2_btc_means = np.mean(model_2_trace['btc'], axis=0)
@@ -391,16 +269,7 @@ for train_index, test_index in kf.split(df):
                                     if dayparts[hour] == daypart_idx:
                                         model_2_log_predictions.append(
                                             model_2_acluster_means[daypart_idx, cluster_idx] + \
-                                            model_2_bs1_means[cluster_idx] * daypart_fs_sin_1[hour] + \
-                                            model_2_bs2_means[cluster_idx] * daypart_fs_sin_2[hour] + \
-                                            model_2_bs3_means[cluster_idx] * daypart_fs_sin_3[hour] + \
-                                            model_2_bs4_means[cluster_idx] * daypart_fs_sin_4[hour] + \
-                                            model_2_bs5_means[cluster_idx] * daypart_fs_sin_5[hour] + \
-                                            model_2_bc1_means[cluster_idx] * daypart_fs_cos_1[hour] + \
-                                            model_2_bc2_means[cluster_idx] * daypart_fs_cos_2[hour] + \
-                                            model_2_bc3_means[cluster_idx] * daypart_fs_cos_3[hour] + \
-                                            model_2_bc4_means[cluster_idx] * daypart_fs_cos_4[hour] + \
-                                            model_2_bc5_means[cluster_idx] * daypart_fs_cos_5[hour] + \
+                                            np.dot(model_2_b_fourier_means[cluster_idx], daypart_fs.loc[hour]) + \
                                             model_2_bth_means[daypart_idx, heat_cluster_idx] * outdoor_temp_h[
                                                 hour] + \
                                             model_2_btc_means[daypart_idx, cool_cluster_idx] * outdoor_temp_c[
@@ -409,26 +278,7 @@ for train_index, test_index in kf.split(df):
                                         model_2_lower_log.append(
                                             model_2_hdi['a_cluster'][daypart_idx, cluster_idx].sel(
                                                 hdi='lower').values + \
-                                            model_2_hdi['bs1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_2_hdi['bs2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_2_hdi['bs3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_2_hdi['bs4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_2_hdi['bs5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_2_hdi['bc1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_2_hdi['bc2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_2_hdi['bc3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_2_hdi['bc4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_2_hdi['bc5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_2_hdi['b_fourier'][cluster_idx].sel(hdi='lower').values, daypart_fs.loc[hour]) + \
                                             model_2_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='lower').values * outdoor_temp_h[hour] + \
                                             model_2_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -438,26 +288,7 @@ for train_index, test_index in kf.split(df):
                                         model_2_higher_log.append(
                                             model_2_hdi['a_cluster'][daypart_idx, cluster_idx].sel(
                                                 hdi='higher').values + \
-                                            model_2_hdi['bs1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_2_hdi['bs2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_2_hdi['bs3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_2_hdi['bs4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_2_hdi['bs5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_2_hdi['bc1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_2_hdi['bc2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_2_hdi['bc3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_2_hdi['bc4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_2_hdi['bc5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_2_hdi['b_fourier'][cluster_idx].sel(hdi='higher').values, daypart_fs.loc[hour]) + \
                                             model_2_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='higher').values * outdoor_temp_h[hour] + \
                                             model_2_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -490,16 +321,7 @@ for train_index, test_index in kf.split(df):
         dayhour = pm.Data("dayhour", dayhours[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -517,24 +339,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("dayhour", "profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[dayhour, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[dayhour, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -542,9 +350,9 @@ for train_index, test_index in kf.split(df):
 
         y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
 
-        approx = pm.fit(n=50000,
-                        method='fullrank_advi',
-                        callbacks=[CheckParametersConvergence(tolerance=0.01)])
+        approx = warm_fit('auto', chained_state(warm_states, "model_3", "model_2"),
+                          n=50000,
+                          callbacks=[CheckParametersConvergence(tolerance=0.01)])
         model_3_trace = approx.sample(1000)
         model_3_idata = az.from_pymc3(model_3_trace)
         az.plot_trace(model_3_idata)
@@ -552,16 +360,7 @@ for train_index, test_index in kf.split(df):
 
     # Calculate predictions
     model_3_acluster_means = np.mean(model_3_trace['a_cluster'], axis=0)
-    model_3_bs1_means = np.mean(model_3_trace['bs1'], axis=0)
-    model_3_bs2_means = np.mean(model_3_trace['bs2'], axis=0)
-    model_3_bs3_means = np.mean(model_3_trace['bs3'], axis=0)
-    model_3_bs4_means = np.mean(model_3_trace['bs4'], axis=0)
-    model_3_bs5_means = np.mean(model_3_trace['bs5'], axis=0)
-    model_3_bc1_means = np.mean(model_3_trace['bc1'], axis=0)
-    model_3_bc2_means = np.mean(model_3_trace['bc2'], axis=0)
-    model_3_bc3_means = np.mean(model_3_trace['bc3'], axis=0)
-    model_3_bc4_means = np.mean(model_3_trace['bc4'], axis=0)
-    model_3_bc5_means = np.mean(model_3_trace['bc5'], axis=0)
+    model_3_b_fourier_means = np.mean(model_3_trace['b_fourier'], axis=0)
 
     model_3_bth_means = np.mean(model_3_trace['bth'], axis=0)
     model_3_btc_means = np.mean(model_3_trace['btc'], axis=0)
@@ -585,16 +384,7 @@ for train_index, test_index in kf.split(df):
                                             if dayparts[hour] == daypart_idx:
                                                 model_3_log_predictions.append(
                                                     model_3_acluster_means[dayhour_idx, cluster_idx] + \
-                                                    model_3_bs1_means[cluster_idx] * daypart_fs_sin_1[hour] + \
-                                                    model_3_bs2_means[cluster_idx] * daypart_fs_sin_2[hour] + \
-                                                    model_3_bs3_means[cluster_idx] * daypart_fs_sin_3[hour] + \
-                                                    model_3_bs4_means[cluster_idx] * daypart_fs_sin_4[hour] + \
-                                                    model_3_bs5_means[cluster_idx] * daypart_fs_sin_5[hour] + \
-                                                    model_3_bc1_means[cluster_idx] * daypart_fs_cos_1[hour] + \
-                                                    model_3_bc2_means[cluster_idx] * daypart_fs_cos_2[hour] + \
-                                                    model_3_bc3_means[cluster_idx] * daypart_fs_cos_3[hour] + \
-                                                    model_3_bc4_means[cluster_idx] * daypart_fs_cos_4[hour] + \
-                                                    model_3_bc5_means[cluster_idx] * daypart_fs_cos_5[hour] + \
+                                                    np.dot(model_3_b_fourier_means[cluster_idx], daypart_fs.loc[hour]) + \
                                                     model_3_bth_means[daypart_idx, heat_cluster_idx] * outdoor_temp_h[
                                                         hour] + \
                                                     model_3_btc_means[daypart_idx, cool_cluster_idx] * outdoor_temp_c[
@@ -603,26 +393,7 @@ for train_index, test_index in kf.split(df):
                                                 model_3_lower_log.append(
                                                     model_3_hdi['a_cluster'][dayhour_idx, cluster_idx].sel(
                                                         hdi='lower').values + \
-                                                    model_3_hdi['bs1'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_sin_1[hour] + \
-                                                    model_3_hdi['bs2'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_sin_2[hour] + \
-                                                    model_3_hdi['bs3'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_sin_3[hour] + \
-                                                    model_3_hdi['bs4'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_sin_4[hour] + \
-                                                    model_3_hdi['bs5'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_sin_5[hour] + \
-                                                    model_3_hdi['bc1'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_cos_1[hour] + \
-                                                    model_3_hdi['bc2'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_cos_2[hour] + \
-                                                    model_3_hdi['bc3'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_cos_3[hour] + \
-                                                    model_3_hdi['bc4'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_cos_4[hour] + \
-                                                    model_3_hdi['bc5'][cluster_idx].sel(hdi='lower').values *
-                                                    daypart_fs_cos_5[hour] + \
+                                                    np.dot(model_3_hdi['b_fourier'][cluster_idx].sel(hdi='lower').values, daypart_fs.loc[hour]) + \
                                                     model_3_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                         hdi='lower').values * outdoor_temp_h[hour] + \
                                                     model_3_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -632,26 +403,7 @@ for train_index, test_index in kf.split(df):
                                                 model_3_higher_log.append(
                                                     model_3_hdi['a_cluster'][dayhour_idx, cluster_idx].sel(
                                                         hdi='higher').values + \
-                                                    model_3_hdi['bs1'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_sin_1[hour] + \
-                                                    model_3_hdi['bs2'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_sin_2[hour] + \
-                                                    model_3_hdi['bs3'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_sin_3[hour] + \
-                                                    model_3_hdi['bs4'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_sin_4[hour] + \
-                                                    model_3_hdi['bs5'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_sin_5[hour] + \
-                                                    model_3_hdi['bc1'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_cos_1[hour] + \
-                                                    model_3_hdi['bc2'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_cos_2[hour] + \
-                                                    model_3_hdi['bc3'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_cos_3[hour] + \
-                                                    model_3_hdi['bc4'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_cos_4[hour] + \
-                                                    model_3_hdi['bc5'][cluster_idx].sel(hdi='higher').values *
-                                                    daypart_fs_cos_5[hour] + \
+                                                    np.dot(model_3_hdi['b_fourier'][cluster_idx].sel(hdi='higher').values, daypart_fs.loc[hour]) + \
                                                     model_3_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                         hdi='higher').values * outdoor_temp_h[hour] + \
                                                     model_3_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -683,16 +435,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -710,24 +453,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -735,9 +464,9 @@ for train_index, test_index in kf.split(df):
 
         y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
 
-        approx = pm.fit(n=50000,
-                        method='fullrank_advi',
-                        callbacks=[CheckParametersConvergence(tolerance=0.01)])
+        approx = warm_fit('auto', chained_state(warm_states, "model_4", "model_3"),
+                          n=50000,
+                          callbacks=[CheckParametersConvergence(tolerance=0.01)])
         model_4_trace = approx.sample(1000)
         model_4_idata = az.from_pymc3(model_4_trace)
         az.plot_trace(model_4_idata)
@@ -745,16 +474,7 @@ for train_index, test_index in kf.split(df):
 
     # Calculate predictions
     model_4_acluster_means = np.mean(model_4_trace['a_cluster'], axis=0)
-    model_4_bs1_means = np.mean(model_4_trace['bs1'], axis=0)
-    model_4_bs2_means = np.mean(model_4_trace['bs2'], axis=0)
-    model_4_bs3_means = np.mean(model_4_trace['bs3'], axis=0)
-    model_4_bs4_means = np.mean(model_4_trace['bs4'], axis=0)
-    model_4_bs5_means = np.mean(model_4_trace['bs5'], axis=0)
-    model_4_bc1_means = np.mean(model_4_trace['bc1'], axis=0)
-    model_4_bc2_means = np.mean(model_4_trace['bc2'], axis=0)
-    model_4_bc3_means = np.mean(model_4_trace['bc3'], axis=0)
-    model_4_bc4_means = np.mean(model_4_trace['bc4'], axis=0)
-    model_4_bc5_means = np.mean(model_4_trace['bc5'], axis=0)
+    model_4_b_fourier_means = np.mean(model_4_trace['b_fourier'], axis=0)
 
     model_4_bth_means = np.mean(model_4_trace['bth'], axis=0)
     model_4_btc_means = np.mean(model_4_trace['btc'], axis=0)
@@ -776,16 +496,7 @@ for train_index, test_index in kf.split(df):
                                     if dayparts[hour] == daypart_idx:
                                         model_4_log_predictions.append(
                                             model_4_acluster_means[cluster_idx] + \
-                                            model_4_bs1_means[cluster_idx] * daypart_fs_sin_1[hour] + \
-                                            model_4_bs2_means[cluster_idx] * daypart_fs_sin_2[hour] + \
-                                            model_4_bs3_means[cluster_idx] * daypart_fs_sin_3[hour] + \
-                                            model_4_bs4_means[cluster_idx] * daypart_fs_sin_4[hour] + \
-                                            model_4_bs5_means[cluster_idx] * daypart_fs_sin_5[hour] + \
-                                            model_4_bc1_means[cluster_idx] * daypart_fs_cos_1[hour] + \
-                                            model_4_bc2_means[cluster_idx] * daypart_fs_cos_2[hour] + \
-                                            model_4_bc3_means[cluster_idx] * daypart_fs_cos_3[hour] + \
-                                            model_4_bc4_means[cluster_idx] * daypart_fs_cos_4[hour] + \
-                                            model_4_bc5_means[cluster_idx] * daypart_fs_cos_5[hour] + \
+                                            np.dot(model_4_b_fourier_means[cluster_idx], daypart_fs.loc[hour]) + \
                                             model_4_bth_means[daypart_idx, heat_cluster_idx] * outdoor_temp_h[
                                                 hour] + \
                                             model_4_btc_means[daypart_idx, cool_cluster_idx] * outdoor_temp_c[
@@ -794,26 +505,7 @@ for train_index, test_index in kf.split(df):
                                         model_4_lower_log.append(
                                             model_4_hdi['a_cluster'][cluster_idx].sel(
                                                 hdi='lower').values + \
-                                            model_4_hdi['bs1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_4_hdi['bs2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_4_hdi['bs3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_4_hdi['bs4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_4_hdi['bs5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_4_hdi['bc1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_4_hdi['bc2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_4_hdi['bc3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_4_hdi['bc4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_4_hdi['bc5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_4_hdi['b_fourier'][cluster_idx].sel(hdi='lower').values, daypart_fs.loc[hour]) + \
                                             model_4_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='lower').values * outdoor_temp_h[hour] + \
                                             model_4_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -823,26 +515,7 @@ for train_index, test_index in kf.split(df):
                                         model_4_higher_log.append(
                                             model_4_hdi['a_cluster'][cluster_idx].sel(
                                                 hdi='higher').values + \
-                                            model_4_hdi['bs1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_4_hdi['bs2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_4_hdi['bs3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_4_hdi['bs4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_4_hdi['bs5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_4_hdi['bc1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_4_hdi['bc2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_4_hdi['bc3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_4_hdi['bc4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_4_hdi['bc5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_4_hdi['b_fourier'][cluster_idx].sel(hdi='higher').values, daypart_fs.loc[hour]) + \
                                             model_4_hdi['bth'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='higher').values * outdoor_temp_h[hour] + \
                                             model_4_hdi['btc'][daypart_idx, cool_cluster_idx].sel(
@@ -874,16 +547,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart_idx = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -905,24 +569,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart","profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[daypart_idx, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[daypart_idx, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc_cluster[daypart_idx, cool_temp_cluster_idx] * cooling_temp + bth_cluster[daypart_idx, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -930,9 +580,9 @@ for train_index, test_index in kf.split(df):
 
         y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims="obs_id")
 
-        approx = pm.fit(n=50000,
-                        method='fullrank_advi',
-                        callbacks=[CheckParametersConvergence(tolerance=0.01)])
+        approx = warm_fit('auto', chained_state(warm_states, "model_5", "model_4"),
+                          n=50000,
+                          callbacks=[CheckParametersConvergence(tolerance=0.01)])
         model_5_trace = approx.sample(1000)
         model_5_idata = az.from_pymc3(model_5_trace)
         az.plot_trace(model_5_idata)
@@ -940,16 +590,7 @@ for train_index, test_index in kf.split(df):
 
     # Calculate predictions
     model_5_acluster_means = np.mean(model_5_trace['a_cluster'], axis=0)
-    model_5_bs1_means = np.mean(model_5_trace['bs1'], axis=0)
-    model_5_bs2_means = np.mean(model_5_trace['bs2'], axis=0)
-    model_5_bs3_means = np.mean(model_5_trace['bs3'], axis=0)
-    model_5_bs4_means = np.mean(model_5_trace['bs4'], axis=0)
-    model_5_bs5_means = np.mean(model_5_trace['bs5'], axis=0)
-    model_5_bc1_means = np.mean(model_5_trace['bc1'], axis=0)
-    model_5_bc2_means = np.mean(model_5_trace['bc2'], axis=0)
-    model_5_bc3_means = np.mean(model_5_trace['bc3'], axis=0)
-    model_5_bc4_means = np.mean(model_5_trace['bc4'], axis=0)
-    model_5_bc5_means = np.mean(model_5_trace['bc5'], axis=0)
+    model_5_b_fourier_means = np.mean(model_5_trace['b_fourier'], axis=0)
 
     model_5_bth_cluster_means = np.mean(model_5_trace['bth_cluster'], axis=0)
     model_5_btc_cluster_means = np.mean(model_5_trace['btc_cluster'], axis=0)
@@ -971,16 +612,7 @@ for train_index, test_index in kf.split(df):
                                     if dayparts[hour] == daypart_idx:
                                         model_5_log_predictions.append(
                                             model_5_acluster_means[daypart_idx, cluster_idx] + \
-                                            model_5_bs1_means[cluster_idx] * daypart_fs_sin_1[hour] + \
-                                            model_5_bs2_means[cluster_idx] * daypart_fs_sin_2[hour] + \
-                                            model_5_bs3_means[cluster_idx] * daypart_fs_sin_3[hour] + \
-                                            model_5_bs4_means[cluster_idx] * daypart_fs_sin_4[hour] + \
-                                            model_5_bs5_means[cluster_idx] * daypart_fs_sin_5[hour] + \
-                                            model_5_bc1_means[cluster_idx] * daypart_fs_cos_1[hour] + \
-                                            model_5_bc2_means[cluster_idx] * daypart_fs_cos_2[hour] + \
-                                            model_5_bc3_means[cluster_idx] * daypart_fs_cos_3[hour] + \
-                                            model_5_bc4_means[cluster_idx] * daypart_fs_cos_4[hour] + \
-                                            model_5_bc5_means[cluster_idx] * daypart_fs_cos_5[hour] + \
+                                            np.dot(model_5_b_fourier_means[cluster_idx], daypart_fs.loc[hour]) + \
                                             model_5_bth_cluster_means[daypart_idx, heat_cluster_idx] * outdoor_temp_h[
                                                 hour] + \
                                             model_5_btc_cluster_means[daypart_idx, cool_cluster_idx] * outdoor_temp_c[
@@ -989,26 +621,7 @@ for train_index, test_index in kf.split(df):
                                         model_5_lower_log.append(
                                             model_5_hdi['a_cluster'][daypart_idx, cluster_idx].sel(
                                                 hdi='lower').values + \
-                                            model_5_hdi['bs1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_5_hdi['bs2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_5_hdi['bs3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_5_hdi['bs4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_5_hdi['bs5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_5_hdi['bc1'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_5_hdi['bc2'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_5_hdi['bc3'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_5_hdi['bc4'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_5_hdi['bc5'][cluster_idx].sel(hdi='lower').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_5_hdi['b_fourier'][cluster_idx].sel(hdi='lower').values, daypart_fs.loc[hour]) + \
                                             model_5_hdi['bth_cluster'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='lower').values * outdoor_temp_h[hour] + \
                                             model_5_hdi['btc_cluster'][daypart_idx, cool_cluster_idx].sel(
@@ -1018,26 +631,7 @@ for train_index, test_index in kf.split(df):
                                         model_5_higher_log.append(
                                             model_5_hdi['a_cluster'][daypart_idx, cluster_idx].sel(
                                                 hdi='higher').values + \
-                                            model_5_hdi['bs1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_1[hour] + \
-                                            model_5_hdi['bs2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_2[hour] + \
-                                            model_5_hdi['bs3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_3[hour] + \
-                                            model_5_hdi['bs4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_4[hour] + \
-                                            model_5_hdi['bs5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_sin_5[hour] + \
-                                            model_5_hdi['bc1'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_1[hour] + \
-                                            model_5_hdi['bc2'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_2[hour] + \
-                                            model_5_hdi['bc3'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_3[hour] + \
-                                            model_5_hdi['bc4'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_4[hour] + \
-                                            model_5_hdi['bc5'][cluster_idx].sel(hdi='higher').values *
-                                            daypart_fs_cos_5[hour] + \
+                                            np.dot(model_5_hdi['b_fourier'][cluster_idx].sel(hdi='higher').values, daypart_fs.loc[hour]) + \
                                             model_5_hdi['bth_cluster'][daypart_idx, heat_cluster_idx].sel(
                                                 hdi='higher').values * outdoor_temp_h[hour] + \
                                             model_5_hdi['btc_cluster'][daypart_idx, cool_cluster_idx].sel(
@@ -6,6 +6,9 @@ from pymc3.variational.callbacks import CheckParametersConvergence
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import KFold
 from math import sqrt
+from fourier_features import fourier_columns
+from bayes_models import design_statistics, sufficient_likelihood
+from bayes_predictive import Term, posterior_predictive_summary
 
 # Optimize with 5 fold CV to compare partial pooling with other methods.
 # Compare cross-validation CV(RMSE) and WAIC
@@ -13,6 +16,10 @@ from math import sqrt
 # ---- DATA IMPORT AND PREPROCESSING
 RANDOM_SEED = 8924
 
+# Fit the no pooling and complete pooling CV models on the per fold Z'Z statistics of their linear terms instead of
+# every training hour (same likelihood, see bayes_models.design_statistics)
+sufficient_statistics = False
+
 # Data import
 df = pd.read_csv("/root/benedetto/data/Id50_preprocessed2.csv", index_col = 0)
 
@@ -44,16 +51,20 @@ n_hours = len(df.index)
 temperature = df.outdoor_temp
 outdoor_temp_c = df.outdoor_temp_c
 outdoor_temp_h = df.outdoor_temp_h
-daypart_fs_sin_1 = df.daypart_fs_sin_1
-daypart_fs_sin_2 = df.daypart_fs_sin_2
-daypart_fs_sin_3 = df.daypart_fs_sin_3
-daypart_fs_sin_4 = df.daypart_fs_sin_4
-daypart_fs_sin_5 = df.daypart_fs_sin_5
-daypart_fs_cos_1 = df.daypart_fs_cos_1
-daypart_fs_cos_2 = df.daypart_fs_cos_2
-daypart_fs_cos_3 = df.daypart_fs_cos_3
-daypart_fs_cos_4 = df.daypart_fs_cos_4
-daypart_fs_cos_5 = df.daypart_fs_cos_5
+fourier_names = fourier_columns("daypart_fs_", 5)
+daypart_fs = df[fourier_names]
+
+# Linear terms and coefficient shapes of the no pooling and complete pooling models (sufficient_statistics)
+nopool_terms = [Term("a", ("daypart", "profile_cluster_idx")), Term("b_fourier", ("profile_cluster_idx",), "fourier"),
+                Term("btc", ("daypart", "cool_temp_cluster_idx"), "cooling_temp"),
+                Term("bth", ("daypart", "heat_temp_cluster_idx"), "heating_temp")]
+nopool_shapes = {"a": (len(unique_dayparts), len(unique_clusters)),
+                 "b_fourier": (len(unique_clusters), len(fourier_names)),
+                 "btc": (len(unique_dayparts), len(unique_cool_clusters)),
+                 "bth": (len(unique_dayparts), len(unique_heat_clusters))}
+complete_pool_terms = [Term("a"), Term("b_fourier", (), "fourier"), Term("btc", (), "cooling_temp"),
+                       Term("bth", (), "heating_temp")]
+complete_pool_shapes = {"a": (), "b_fourier": (len(fourier_names),), "btc": (), "bth": ()}
 
 # 1 - CV(RMSE) and coverage through cross-validation
 # First run a cross-validation to calculate cv(rmse) and coverage on unseen data for the three pooling techniques
@@ -74,8 +85,19 @@ complete_pool_coverage_list = []
 
 for train_index, test_index in kf.split(df):
 
+    # Arrays of the linear terms on the train and test fold
+    train_data = {"profile_cluster_idx": clusters[train_index].values, "heat_temp_cluster_idx": heat_clusters[train_index].values,
+                  "cool_temp_cluster_idx": cool_clusters[train_index].values, "daypart": dayparts[train_index].values,
+                  "fourier": daypart_fs.loc[train_index].values, "cooling_temp": outdoor_temp_c[train_index].values,
+                  "heating_temp": outdoor_temp_h[train_index].values, "log_v": log_electricity[train_index]}
+    test_data = {"profile_cluster_idx": clusters[test_index].values, "heat_temp_cluster_idx": heat_clusters[test_index].values,
+                 "cool_temp_cluster_idx": cool_clusters[test_index].values, "daypart": dayparts[test_index].values,
+                 "fourier": daypart_fs.loc[test_index].values, "cooling_temp": outdoor_temp_c[test_index].values,
+                 "heating_temp": outdoor_temp_h[test_index].values}
+
     coords = {"obs_id": np.arange(temperature[train_index].size)}
     coords["profile_cluster"] = unique_clusters
+    coords["fourier"] = fourier_names
     coords["heat_cluster"] = unique_heat_clusters
     coords["cool_cluster"] = unique_cool_clusters
     coords["daypart"] = unique_dayparts
@@ -86,16 +108,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -113,24 +126,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart", "profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -151,10 +150,7 @@ for train_index, test_index in kf.split(df):
     with partial_pooling:
 
         pm.set_data({"profile_cluster_idx": clusters[test_index], "heat_temp_cluster_idx": heat_clusters[test_index],
-                     "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fs_sin_1": daypart_fs_sin_1[test_index],
-                     "fs_sin_2": daypart_fs_sin_2[test_index], "fs_sin_3": daypart_fs_sin_3[test_index], "fs_sin_4": daypart_fs_sin_4[test_index],
-                     "fs_sin_5": daypart_fs_sin_5[test_index], "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index],
-                     "fs_cos_3": daypart_fs_cos_3[test_index], "fs_cos_4": daypart_fs_cos_4[test_index], "fs_cos_5": daypart_fs_cos_5[test_index],
+                     "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fourier": daypart_fs.loc[test_index],
                      "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
 
         partial_pool_posterior_hdi = pm.sample_posterior_predictive(partial_pooling_trace, keep_size=True)
@@ -184,16 +180,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -203,29 +190,20 @@ for train_index, test_index in kf.split(df):
         btc = pm.Normal("btc", mu=0.0, sigma=1.0, dims=("daypart", "cool_cluster"))
         bth = pm.Normal("bth", mu=0.0, sigma=1.0, dims=("daypart", "heat_cluster"))
 
-        bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=0.0, sigma=1.0, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=0.0, sigma=1.0, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=0.0, sigma=1.0, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
         sigma = pm.Exponential("sigma", 1.0)
 
-        y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims='obs_id')
+        if sufficient_statistics:
+            y = sufficient_likelihood("y", [a_cluster, b_fourier, btc, bth], sigma,
+                                      design_statistics(nopool_terms, nopool_shapes, train_data))
+        else:
+            y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims='obs_id')
 
     # Fitting without sampling
     with no_pooling:
@@ -235,27 +213,32 @@ for train_index, test_index in kf.split(df):
         no_pooling_trace = approx.sample(1000)
         no_pooling_idata = az.from_pymc3(no_pooling_trace)
 
-    # Sampling from the posterior setting test data to check the predictions on unseen data
+    # Sampling from the posterior setting test data to check the predictions on unseen data (in NumPy from the
+    # draws when there is no observed y)
 
-    with no_pooling:
+    if sufficient_statistics:
+        nopool_summary = posterior_predictive_summary(no_pooling_trace, nopool_terms, test_data,
+                                                      df.total_electricity[test_index].values, random_seed=RANDOM_SEED)
+        nopool_predictions = nopool_summary['prediction']
+        nopool_lower_bound = nopool_summary['lower_bound']
+        nopool_higher_bound = nopool_summary['higher_bound']
+    else:
+        with no_pooling:
 
-        pm.set_data({"profile_cluster_idx": clusters[test_index], "heat_temp_cluster_idx": heat_clusters[test_index],
-                     "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fs_sin_1": daypart_fs_sin_1[test_index],
-                     "fs_sin_2": daypart_fs_sin_2[test_index], "fs_sin_3": daypart_fs_sin_3[test_index], "fs_sin_4": daypart_fs_sin_4[test_index],
-                     "fs_sin_5": daypart_fs_sin_5[test_index], "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index],
-                     "fs_cos_3": daypart_fs_cos_3[test_index], "fs_cos_4": daypart_fs_cos_4[test_index], "fs_cos_5": daypart_fs_cos_5[test_index],
-                     "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
+            pm.set_data({"profile_cluster_idx": clusters[test_index], "heat_temp_cluster_idx": heat_clusters[test_index],
+                         "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fourier": daypart_fs.loc[test_index],
+                         "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
 
-        nopool_posterior_hdi = pm.sample_posterior_predictive(no_pooling_trace, keep_size=True)
-        nopool_posterior = pm.sample_posterior_predictive(no_pooling_trace)
+            nopool_posterior_hdi = pm.sample_posterior_predictive(no_pooling_trace, keep_size=True)
+            nopool_posterior = pm.sample_posterior_predictive(no_pooling_trace)
 
 
-    # Calculate predictions and HDI
+        # Calculate predictions and HDI
 
-    nopool_predictions = np.exp(nopool_posterior['y'].mean(0))
-    nopool_hdi_data = az.hdi(nopool_posterior_hdi)
-    nopool_lower_bound = np.array(np.exp(nopool_hdi_data.to_array().sel(hdi='lower'))).flatten()
-    nopool_higher_bound = np.array(np.exp(nopool_hdi_data.to_array().sel(hdi='higher'))).flatten()
+        nopool_predictions = np.exp(nopool_posterior['y'].mean(0))
+        nopool_hdi_data = az.hdi(nopool_posterior_hdi)
+        nopool_lower_bound = np.array(np.exp(nopool_hdi_data.to_array().sel(hdi='lower'))).flatten()
+        nopool_higher_bound = np.array(np.exp(nopool_hdi_data.to_array().sel(hdi='higher'))).flatten()
 
     # Calculate cvrmse and coverage of the HDI
     nopool_mse = mean_squared_error(df.total_electricity[test_index], nopool_predictions)
@@ -269,16 +252,7 @@ for train_index, test_index in kf.split(df):
 
     with pm.Model(coords=coords) as complete_pooling:
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -288,25 +262,19 @@ for train_index, test_index in kf.split(df):
         btc = pm.Normal("btc", mu=0.0, sigma=1.0)
         bth = pm.Normal("bth", mu=0.0, sigma=1.0)
 
-        bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0)
-        bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0)
-        bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0)
-        bs4 = pm.Normal("bs4", mu=0.0, sigma=1.0)
-        bs5 = pm.Normal("bs5", mu=0.0, sigma=1.0)
-        bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0)
-        bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0)
-        bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0)
-        bc4 = pm.Normal("bc4", mu=0.0, sigma=1.0)
-        bc5 = pm.Normal("bc5", mu=0.0, sigma=1.0)
+        b_fourier = pm.Normal("b_fourier", mu=0.0, sigma=1.0, dims="fourier")
 
         # Expected value per county:
-        mu = a + bs1 * fs_sin_1 + bs2 * fs_sin_2 + bs3 * fs_sin_3 + bs4 * fs_sin_4 + bs5 * fs_sin_5 + bc1 * fs_cos_1 + \
-             bc2 * fs_cos_2 + bc3 * fs_cos_3 + bc4 * fs_cos_4 + bc5 * fs_cos_5 + btc * cooling_temp + bth * heating_temp
+        mu = a + pm.math.dot(fourier, b_fourier) + btc * cooling_temp + bth * heating_temp
 
         # Model error:
         sigma = pm.Exponential("sigma", 1.0)
 
-        y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims='obs_id')
+        if sufficient_statistics:
+            y = sufficient_likelihood("y", [a, b_fourier, btc, bth], sigma,
+                                      design_statistics(complete_pool_terms, complete_pool_shapes, train_data))
+        else:
+            y = pm.Normal("y", mu, sigma=sigma, observed=log_electricity[train_index], dims='obs_id')
 
     # Fitting without sampling
     with complete_pooling:
@@ -318,23 +286,28 @@ for train_index, test_index in kf.split(df):
 
     # Sampling from the posterior setting test data to check the predictions on unseen data
 
-    with complete_pooling:
+    if sufficient_statistics:
+        complete_pool_summary = posterior_predictive_summary(complete_pooling_trace, complete_pool_terms, test_data,
+                                                             df.total_electricity[test_index].values,
+                                                             random_seed=RANDOM_SEED)
+        complete_pool_predictions = complete_pool_summary['prediction']
+        complete_pool_lower_bound = complete_pool_summary['lower_bound']
+        complete_pool_higher_bound = complete_pool_summary['higher_bound']
+    else:
+        with complete_pooling:
 
-        pm.set_data({"fs_sin_1": daypart_fs_sin_1[test_index], "fs_sin_2": daypart_fs_sin_2[test_index], "fs_sin_3": daypart_fs_sin_3[test_index],
-                     "fs_sin_4": daypart_fs_sin_4[test_index], "fs_sin_5": daypart_fs_sin_5[test_index], "fs_cos_1": daypart_fs_cos_1[test_index],
-                     "fs_cos_2": daypart_fs_cos_2[test_index], "fs_cos_3": daypart_fs_cos_3[test_index], "fs_cos_4": daypart_fs_cos_4[test_index],
-                     "fs_cos_5": daypart_fs_cos_5[test_index], "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
+            pm.set_data({"fourier": daypart_fs.loc[test_index], "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
 
-        complete_pool_posterior_hdi = pm.sample_posterior_predictive(complete_pooling_trace, keep_size=True)
-        complete_pool_posterior = pm.sample_posterior_predictive(complete_pooling_trace)
+            complete_pool_posterior_hdi = pm.sample_posterior_predictive(complete_pooling_trace, keep_size=True)
+            complete_pool_posterior = pm.sample_posterior_predictive(complete_pooling_trace)
 
 
-    # Calculate predictions and HDI
+        # Calculate predictions and HDI
 
-    complete_pool_predictions = np.exp(complete_pool_posterior['y'].mean(0))
-    complete_pool_hdi_data = az.hdi(complete_pool_posterior_hdi)
-    complete_pool_lower_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='lower'))).flatten()
-    complete_pool_higher_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='higher'))).flatten()
+        complete_pool_predictions = np.exp(complete_pool_posterior['y'].mean(0))
+        complete_pool_hdi_data = az.hdi(complete_pool_posterior_hdi)
+        complete_pool_lower_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='lower'))).flatten()
+        complete_pool_higher_bound = np.array(np.exp(complete_pool_hdi_data.to_array().sel(hdi='higher'))).flatten()
 
     # Calculate cvrmse and coverage of the HDI
     complete_pool_mse = mean_squared_error(df.total_electricity[test_index], complete_pool_predictions)
@@ -363,16 +336,7 @@ with pm.Model(coords=coords_2) as partial_pooling_2:
     cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters, dims="obs_id")
     daypart = pm.Data("daypart", dayparts, dims = "obs_id")
 
-    fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1, dims = "obs_id")
-    fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2, dims = "obs_id")
-    fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3, dims = "obs_id")
-    fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4, dims = "obs_id")
-    fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5, dims = "obs_id")
-    fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1, dims = "obs_id")
-    fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2, dims = "obs_id")
-    fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3, dims = "obs_id")
-    fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4, dims = "obs_id")
-    fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5, dims = "obs_id")
+    fourier = pm.Data("fourier", daypart_fs, dims=("obs_id", "fourier"))
 
     cooling_temp = pm.Data("cooling_temp", outdoor_temp_c, dims="obs_id")
     heating_temp = pm.Data("heating_temp", outdoor_temp_h, dims="obs_id")
@@ -390,23 +354,10 @@ with pm.Model(coords=coords_2) as partial_pooling_2:
     a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart", "profile_cluster"))
 
     # Varying slopes:
-    bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+    b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
     # Expected value per county:
-    mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[profile_cluster_idx] * fs_sin_2 + \
-         bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-         bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-         bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-         bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+    mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
          btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
     # Model error:
@@ -430,16 +381,7 @@ with pm.Model(coords=coords_2) as no_pooling_2:
     cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters, dims="obs_id")
     daypart = pm.Data("daypart", dayparts, dims="obs_id")
 
-    fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1, dims="obs_id")
-    fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2, dims="obs_id")
-    fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3, dims="obs_id")
-    fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4, dims="obs_id")
-    fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5, dims="obs_id")
-    fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1, dims="obs_id")
-    fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2, dims="obs_id")
-    fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3, dims="obs_id")
-    fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4, dims="obs_id")
-    fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5, dims="obs_id")
+    fourier = pm.Data("fourier", daypart_fs, dims=("obs_id", "fourier"))
 
     cooling_temp = pm.Data("cooling_temp", outdoor_temp_c, dims="obs_id")
     heating_temp = pm.Data("heating_temp", outdoor_temp_h, dims="obs_id")
@@ -449,24 +391,10 @@ with pm.Model(coords=coords_2) as no_pooling_2:
     btc = pm.Normal("btc", mu=0.0, sigma=1.0, dims=("daypart", "cool_cluster"))
     bth = pm.Normal("bth", mu=0.0, sigma=1.0, dims=("daypart", "heat_cluster"))
 
-    bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bs4 = pm.Normal("bs4", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bs5 = pm.Normal("bs5", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bc4 = pm.Normal("bc4", mu=0.0, sigma=1.0, dims="profile_cluster")
-    bc5 = pm.Normal("bc5", mu=0.0, sigma=1.0, dims="profile_cluster")
+    b_fourier = pm.Normal("b_fourier", mu=0.0, sigma=1.0, dims=("profile_cluster", "fourier"))
 
     # Expected value per county:
-    mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-        profile_cluster_idx] * fs_sin_2 + \
-         bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-         bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-         bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-         bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+    mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
          btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
     # Model error:
@@ -484,16 +412,7 @@ with no_pooling_2:
 # Sampling from the posterior setting test data to check the predictions on unseen data
 
 with pm.Model(coords=coords_2) as complete_pooling_2:
-    fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1, dims="obs_id")
-    fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2, dims="obs_id")
-    fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3, dims="obs_id")
-    fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4, dims="obs_id")
-    fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5, dims="obs_id")
-    fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1, dims="obs_id")
-    fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2, dims="obs_id")
-    fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3, dims="obs_id")
-    fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4, dims="obs_id")
-    fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5, dims="obs_id")
+    fourier = pm.Data("fourier", daypart_fs, dims=("obs_id", "fourier"))
 
     cooling_temp = pm.Data("cooling_temp", outdoor_temp_c, dims="obs_id")
     heating_temp = pm.Data("heating_temp", outdoor_temp_h, dims="obs_id")
@@ -503,20 +422,10 @@ with pm.Model(coords=coords_2) as complete_pooling_2:
     btc = pm.Normal("btc", mu=0.0, sigma=1.0)
     bth = pm.Normal("bth", mu=0.0, sigma=1.0)
 
-    bs1 = pm.Normal("bs1", mu=0.0, sigma=1.0)
-    bs2 = pm.Normal("bs2", mu=0.0, sigma=1.0)
-    bs3 = pm.Normal("bs3", mu=0.0, sigma=1.0)
-    bs4 = pm.Normal("bs4", mu=0.0, sigma=1.0)
-    bs5 = pm.Normal("bs5", mu=0.0, sigma=1.0)
-    bc1 = pm.Normal("bc1", mu=0.0, sigma=1.0)
-    bc2 = pm.Normal("bc2", mu=0.0, sigma=1.0)
-    bc3 = pm.Normal("bc3", mu=0.0, sigma=1.0)
-    bc4 = pm.Normal("bc4", mu=0.0, sigma=1.0)
-    bc5 = pm.Normal("bc5", mu=0.0, sigma=1.0)
+    b_fourier = pm.Normal("b_fourier", mu=0.0, sigma=1.0, dims="fourier")
 
     # Expected value per county:
-    mu = a + bs1 * fs_sin_1 + bs2 * fs_sin_2 + bs3 * fs_sin_3 + bs4 * fs_sin_4 + bs5 * fs_sin_5 + bc1 * fs_cos_1 + \
-         bc2 * fs_cos_2 + bc3 * fs_cos_3 + bc4 * fs_cos_4 + bc5 * fs_cos_5 + btc * cooling_temp + bth * heating_temp
+    mu = a + pm.math.dot(fourier, b_fourier) + btc * cooling_temp + bth * heating_temp
 
     # Model error:
     sigma = pm.Exponential("sigma", 1.0)
@@ -8,9 +8,14 @@ from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import KFold
 from math import sqrt
 from pymc3.variational.callbacks import CheckParametersConvergence
+from fourier_features import fourier_columns
+from fold_executor import run_folds
 
 RANDOM_SEED = 8924
 
+# Folds fitted in parallel (single threaded worker processes, see fold_executor)
+N_WORKERS = 10
+
 # Data import
 df = pd.read_csv("~/Github/Bayes-M&V/data/Id50_preprocessed2.csv", index_col=0)
 
@@ -35,13 +40,9 @@ def make_plot(title, hist, edges, x):
 
 
 x = np.linspace(0, 30000, num=3000)
-p1 = make_plot("Electricity hist", hist, edges, x)
-
 measured_log = df[np.isfinite(df["total_electricity"])].log_v
 hist_l, edges_l = np.histogram(measured_log, density=True, bins=50)
 x_l = np.linspace(0, 12, num=20)
-p2 = make_plot("Log Electricity Hist", hist_l, edges_l, x_l)
-show(gridplot([p1, p2], ncols=2))
 
 # Create local variables (assign daypart, cluster values need to start from 0)
 # clusters are use profile categories, heat_clusters and cool_clusters indicate days having similar
@@ -66,40 +67,26 @@ n_hours = len(df.index)
 temperature = df.outdoor_temp
 outdoor_temp_c = df.outdoor_temp_c
 outdoor_temp_h = df.outdoor_temp_h
-daypart_fs_sin_1 = df.daypart_fs_sin_1
-daypart_fs_sin_2 = df.daypart_fs_sin_2
-daypart_fs_sin_3 = df.daypart_fs_sin_3
-daypart_fs_sin_4 = df.daypart_fs_sin_4
-daypart_fs_sin_5 = df.daypart_fs_sin_5
-daypart_fs_cos_1 = df.daypart_fs_cos_1
-daypart_fs_cos_2 = df.daypart_fs_cos_2
-daypart_fs_cos_3 = df.daypart_fs_cos_3
-daypart_fs_cos_4 = df.daypart_fs_cos_4
-daypart_fs_cos_5 = df.daypart_fs_cos_5
+fourier_names = fourier_columns("daypart_fs_", 5)
+daypart_fs = df[fourier_names]
 
 # create coords for pymc3
 coords = {"obs_id": np.arange(temperature.size)}
 coords["profile_cluster"] = unique_clusters
+coords["fourier"] = fourier_names
 coords["heat_cluster"] = unique_heat_clusters
 coords["cool_cluster"] = unique_cool_clusters
 coords["daypart"] = unique_dayparts
 
-# Create kfold cross-validation splits
-
-kf = KFold(n_splits = 10)
-kf.get_n_splits(df)
-
-# Create array to save cross validation accuracy
-partial_pooling_cv_accuracy = []
-coverage_list = []
-
 # Bayesian linear model with Intercept, Fourier series for the seasonal features,
-# temperatures, pooled on profile and temperature clustering
+# temperatures, pooled on profile and temperature clustering, fitted on one fold
 
-for train_index, test_index in kf.split(df):
+def partial_pooling_fold(fold):
+    train_index, test_index = fold
 
     coords = {"obs_id": np.arange(temperature[train_index].size)}
     coords["profile_cluster"] = unique_clusters
+    coords["fourier"] = fourier_names
     coords["heat_cluster"] = unique_heat_clusters
     coords["cool_cluster"] = unique_cool_clusters
     coords["daypart"] = unique_dayparts
@@ -110,16 +97,7 @@ for train_index, test_index in kf.split(df):
         cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters[train_index], dims="obs_id")
         daypart = pm.Data("daypart", dayparts[train_index], dims="obs_id")
 
-        fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1[train_index], dims="obs_id")
-        fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2[train_index], dims="obs_id")
-        fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3[train_index], dims="obs_id")
-        fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4[train_index], dims="obs_id")
-        fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5[train_index], dims="obs_id")
-        fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1[train_index], dims="obs_id")
-        fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2[train_index], dims="obs_id")
-        fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3[train_index], dims="obs_id")
-        fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4[train_index], dims="obs_id")
-        fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5[train_index], dims="obs_id")
+        fourier = pm.Data("fourier", daypart_fs.loc[train_index], dims=("obs_id", "fourier"))
 
         cooling_temp = pm.Data("cooling_temp", outdoor_temp_c[train_index], dims="obs_id")
         heating_temp = pm.Data("heating_temp", outdoor_temp_h[train_index], dims="obs_id")
@@ -137,24 +115,10 @@ for train_index, test_index in kf.split(df):
         a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims=("daypart", "profile_cluster"))
 
         # Varying slopes:
-        bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-        bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+        b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
 
         # Expected value per county:
-        mu = a_cluster[daypart, profile_cluster_idx] + bs1[profile_cluster_idx] * fs_sin_1 + bs2[
-            profile_cluster_idx] * fs_sin_2 + \
-             bs3[profile_cluster_idx] * fs_sin_3 + bs4[profile_cluster_idx] * fs_sin_4 + \
-             bs5[profile_cluster_idx] * fs_sin_5 + bc1[profile_cluster_idx] * fs_cos_1 + \
-             bc2[profile_cluster_idx] * fs_cos_2 + bc3[profile_cluster_idx] * fs_cos_3 + \
-             bc4[profile_cluster_idx] * fs_cos_4 + bc5[profile_cluster_idx] * fs_cos_5 + \
+        mu = a_cluster[daypart, profile_cluster_idx] + (b_fourier[profile_cluster_idx] * fourier).sum(axis=1) + \
              btc[daypart, cool_temp_cluster_idx] * cooling_temp + bth[daypart, heat_temp_cluster_idx] * heating_temp
 
         # Model error:
@@ -175,10 +139,7 @@ for train_index, test_index in kf.split(df):
     with partial_pooling:
 
         pm.set_data({"profile_cluster_idx": clusters[test_index], "heat_temp_cluster_idx": heat_clusters[test_index],
-                     "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fs_sin_1": daypart_fs_sin_1[test_index],
-                     "fs_sin_2": daypart_fs_sin_2[test_index], "fs_sin_3": daypart_fs_sin_3[test_index], "fs_sin_4": daypart_fs_sin_4[test_index],
-                     "fs_sin_5": daypart_fs_sin_5[test_index], "fs_cos_1": daypart_fs_cos_1[test_index], "fs_cos_2": daypart_fs_cos_2[test_index],
-                     "fs_cos_3": daypart_fs_cos_3[test_index], "fs_cos_4": daypart_fs_cos_4[test_index], "fs_cos_5": daypart_fs_cos_5[test_index],
+                     "cool_temp_cluster_idx": cool_clusters[test_index], "daypart": dayparts[test_index], "fourier": daypart_fs.loc[test_index],
                      "cooling_temp": outdoor_temp_c[test_index], "heating_temp": outdoor_temp_h[test_index]})
 
         posterior_hdi = pm.sample_posterior_predictive(partial_pooling_trace, keep_size=True)
@@ -198,8 +159,25 @@ for train_index, test_index in kf.split(df):
     cvrmse = rmse / df.total_electricity.mean()
     coverage = sum((lower_bound <= df.total_electricity[test_index]) & (df.total_electricity[test_index] <= higher_bound)) * 100 / len(test_index)
 
-    partial_pooling_cv_accuracy.append (cvrmse)
-    coverage_list.append(coverage)
+    return cvrmse, coverage
+
+
+if __name__ == "__main__":
+    p1 = make_plot("Electricity hist", hist, edges, x)
+    p2 = make_plot("Log Electricity Hist", hist_l, edges_l, x_l)
+    show(gridplot([p1, p2], ncols=2))
+
+    # Create kfold cross-validation splits
+
+    kf = KFold(n_splits = 10)
+    kf.get_n_splits(df)
+
+    # Folds run in parallel, results in fold order
+    folds = run_folds(partial_pooling_fold, list(kf.split(df)), N_WORKERS)
+
+    # Create array to save cross validation accuracy
+    partial_pooling_cv_accuracy = [cvrmse for cvrmse, coverage in folds]
+    coverage_list = [coverage for cvrmse, coverage in folds]
 
-avg_cvrmse = np.mean(partial_pooling_cv_accuracy)
-avg_coverage = np.mean(coverage_list)
\ No newline at end of file
+    avg_cvrmse = np.mean(partial_pooling_cv_accuracy)
+    avg_coverage = np.mean(coverage_list)
\ No newline at end of file
@@ -10,6 +10,9 @@ import warnings
 from sklearn.metrics import mean_squared_error
 from math import sqrt
 from pymc3.variational.callbacks import CheckParametersConvergence
+from fourier_features import fourier_columns
+from bayes_models import packed_minibatch
+from bayes_predictive import Term, posterior_mean_mu
 
 RANDOM_SEED = 8924
 
@@ -69,62 +72,34 @@ n_hours = len(df.index)
 temperature = df.outdoor_temp
 outdoor_temp_c = df.outdoor_temp_c
 outdoor_temp_h = df.outdoor_temp_h
-daypart_fs_sin_1 = df.daypart_fs_sin_1
-daypart_fs_sin_2 = df.daypart_fs_sin_2
-daypart_fs_sin_3 = df.daypart_fs_sin_3
-daypart_fs_sin_4 = df.daypart_fs_sin_4
-daypart_fs_sin_5 = df.daypart_fs_sin_5
-daypart_fs_cos_1 = df.daypart_fs_cos_1
-daypart_fs_cos_2 = df.daypart_fs_cos_2
-daypart_fs_cos_3 = df.daypart_fs_cos_3
-daypart_fs_cos_4 = df.daypart_fs_cos_4
-daypart_fs_cos_5 = df.daypart_fs_cos_5
+fourier_names = fourier_columns("daypart_fs_", 5)
+daypart_fs = df[fourier_names]
 
 coords = {"obs_id": np.arange(temperature.size)}
 coords["profile_cluster"] = unique_clusters
+coords["fourier"] = fourier_names
 coords["heat_cluster"] = unique_heat_clusters
 coords["cool_cluster"] = unique_cool_clusters
 coords["daypart"] = unique_dayparts
 
+# Hourly arrays of the model
+data = {"profile_cluster_idx": clusters.values, "heat_temp_cluster_idx": heat_clusters.values,
+        "cool_temp_cluster_idx": cool_clusters.values, "fourier": daypart_fs.values,
+        "cooling_temp": outdoor_temp_c.values, "heating_temp": outdoor_temp_h.values, "log_v": log_electricity}
+
 # Intercept, Fourier, temperatures, with profile and temperature clustering -  MINIBATCH
 
 with pm.Model(coords=coords) as partial_pooling_mb:
-    profile_cluster_idx = pm.Data("profile_cluster_idx", clusters, dims="obs_id")
-    heat_temp_cluster_idx = pm.Data("heat_temp_cluster_idx", heat_clusters, dims="obs_id")
-    cool_temp_cluster_idx = pm.Data("cool_temp_cluster_idx", cool_clusters, dims="obs_id")
-
-    fs_sin_1 = pm.Data("fs_sin_1", daypart_fs_sin_1, dims = "obs_id")
-    fs_sin_2 = pm.Data("fs_sin_2", daypart_fs_sin_2, dims = "obs_id")
-    fs_sin_3 = pm.Data("fs_sin_3", daypart_fs_sin_3, dims = "obs_id")
-    fs_sin_4 = pm.Data("fs_sin_4", daypart_fs_sin_4, dims = "obs_id")
-    fs_sin_5 = pm.Data("fs_sin_5", daypart_fs_sin_5, dims = "obs_id")
-    fs_cos_1 = pm.Data("fs_cos_1", daypart_fs_cos_1, dims = "obs_id")
-    fs_cos_2 = pm.Data("fs_cos_2", daypart_fs_cos_2, dims = "obs_id")
-    fs_cos_3 = pm.Data("fs_cos_3", daypart_fs_cos_3, dims = "obs_id")
-    fs_cos_4 = pm.Data("fs_cos_4", daypart_fs_cos_4, dims = "obs_id")
-    fs_cos_5 = pm.Data("fs_cos_5", daypart_fs_cos_5, dims = "obs_id")
-
-    cooling_temp = pm.Data("cooling_temp", outdoor_temp_c, dims="obs_id")
-    heating_temp = pm.Data("heating_temp", outdoor_temp_h, dims="obs_id")
-
-    # Minibatch replacements
+    # Minibatch replacements, the same hours of every array in each step
     batch_size = 1000
-    profile_cluster_mb = pm.Minibatch(profile_cluster_idx.get_value(), batch_size)
-    heat_cluster_mb = pm.Minibatch(heat_temp_cluster_idx.get_value(), batch_size)
-    cool_cluster_mb = pm.Minibatch(cool_temp_cluster_idx.get_value(), batch_size)
-    fs1_mb = pm.Minibatch(fs_sin_1.get_value(), batch_size)
-    fs2_mb = pm.Minibatch(fs_sin_2.get_value(), batch_size)
-    fs3_mb = pm.Minibatch(fs_sin_3.get_value(), batch_size)
-    fs4_mb = pm.Minibatch(fs_sin_4.get_value(), batch_size)
-    fs5_mb = pm.Minibatch(fs_sin_5.get_value(), batch_size)
-    fc1_mb = pm.Minibatch(fs_cos_1.get_value(), batch_size)
-    fc2_mb = pm.Minibatch(fs_cos_2.get_value(), batch_size)
-    fc3_mb = pm.Minibatch(fs_cos_3.get_value(), batch_size)
-    fc4_mb = pm.Minibatch(fs_cos_4.get_value(), batch_size)
-    fc5_mb = pm.Minibatch(fs_cos_5.get_value(), batch_size)
-    cooling_temp_mb = pm.Minibatch(cooling_temp.get_value(), batch_size)
-    heating_temp_mb = pm.Minibatch(heating_temp.get_value(), batch_size)
-    log_electricity_mb = pm.Minibatch(log_electricity, batch_size)
+    minibatch = packed_minibatch(data, batch_size, RANDOM_SEED)
+    profile_cluster_mb = minibatch["profile_cluster_idx"]
+    heat_cluster_mb = minibatch["heat_temp_cluster_idx"]
+    cool_cluster_mb = minibatch["cool_temp_cluster_idx"]
+    fourier_mb = minibatch["fourier"]
+    cooling_temp_mb = minibatch["cooling_temp"]
+    heating_temp_mb = minibatch["heating_temp"]
+    log_electricity_mb = minibatch["log_v"]
 
 
     # Hyperpriors:
@@ -142,25 +117,12 @@ with pm.Model(coords=coords) as partial_pooling_mb:
     a_cluster = pm.Normal("a_cluster", mu=a, sigma=sigma_a, dims="profile_cluster")
 
     # Varying slopes:
-    bs1 = pm.Normal("bs1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs2 = pm.Normal("bs2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs3 = pm.Normal("bs3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs4 = pm.Normal("bs4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bs5 = pm.Normal("bs5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc1 = pm.Normal("bc1", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc2 = pm.Normal("bc2", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc3 = pm.Normal("bc3", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc4 = pm.Normal("bc4", mu=bf, sigma=sigma_bf, dims="profile_cluster")
-    bc5 = pm.Normal("bc5", mu=bf, sigma=sigma_bf, dims="profile_cluster")
+    b_fourier = pm.Normal("b_fourier", mu=bf, sigma=sigma_bf, dims=("profile_cluster", "fourier"))
     btc_cluster = pm.Normal("btc_cluster", mu=btc, sigma=sigma_btc, dims="cool_cluster")
     bth_cluster = pm.Normal("bth_cluster", mu=bth, sigma=sigma_bth, dims="heat_cluster")
 
     # Expected value per county:
-    mu = a_cluster[profile_cluster_mb] + bs1[profile_cluster_mb] * fs1_mb + bs2[profile_cluster_mb] * fs2_mb + \
-         bs3[profile_cluster_mb] * fs3_mb + bs4[profile_cluster_mb] * fs4_mb + \
-         bs5[profile_cluster_mb] * fs5_mb + bc1[profile_cluster_mb] * fc1_mb + \
-         bc2[profile_cluster_mb] * fc2_mb + bc3[profile_cluster_mb] * fc3_mb + \
-         bc4[profile_cluster_mb] * fc4_mb + bc5[profile_cluster_mb] * fc5_mb + \
+    mu = a_cluster[profile_cluster_mb] + (b_fourier[profile_cluster_mb] * fourier_mb).sum(axis=1) + \
          btc_cluster[cool_cluster_mb] * cooling_temp_mb + bth_cluster[heat_cluster_mb] * heating_temp_mb
 
     # Model error:
@@ -186,54 +148,19 @@ az.plot_trace(partial_pooling_idata)
 plt.show()
 
 # Let's sample from the posterior to plot the predictions and have a rough estimate of the model accuracy
-# Calculate mean for each cluster value from the posterior samples
-
-
-partial_pooling_acluster_means = np.mean(partial_pooling_trace['a_cluster'], axis =0)
-partial_pooling_bs1_means = np.mean(partial_pooling_trace['bs1'], axis =0)
-partial_pooling_bs2_means = np.mean(partial_pooling_trace['bs2'], axis =0)
-partial_pooling_bs3_means = np.mean(partial_pooling_trace['bs3'], axis =0)
-partial_pooling_bs4_means = np.mean(partial_pooling_trace['bs4'], axis =0)
-partial_pooling_bs5_means = np.mean(partial_pooling_trace['bs5'], axis =0)
-partial_pooling_bc1_means = np.mean(partial_pooling_trace['bc1'], axis =0)
-partial_pooling_bc2_means = np.mean(partial_pooling_trace['bc2'], axis =0)
-partial_pooling_bc3_means = np.mean(partial_pooling_trace['bc3'], axis =0)
-partial_pooling_bc4_means = np.mean(partial_pooling_trace['bc4'], axis =0)
-partial_pooling_bc5_means = np.mean(partial_pooling_trace['bc5'], axis =0)
-
-partial_pooling_bth_means = np.mean(partial_pooling_trace['btc_cluster'], axis = 0)
-partial_pooling_btc_means = np.mean(partial_pooling_trace['btc_cluster'], axis = 0)
-# Create array with predictions
-partial_pooling_predictions = []
+
+# Terms of mu in the model, for the NumPy predictions gathering the coefficients by the index arrays
+partial_pooling_terms = [Term("a_cluster", ("profile_cluster_idx",)),
+                         Term("b_fourier", ("profile_cluster_idx",), "fourier"),
+                         Term("btc_cluster", ("cool_temp_cluster_idx",), "cooling_temp"),
+                         Term("bth_cluster", ("heat_temp_cluster_idx",), "heating_temp")]
+
+# Predictions from the coefficient means. Predictions of every posterior draw (bayes_predictive.posterior_mu) are a
+# draws x hours array, their bounds are computed in blocks of hours by posterior_predictive_summary
+partial_pooling_predictions = posterior_mean_mu(partial_pooling_trace, partial_pooling_terms, data)
+
 # Create array with bounds
 partial_pooling_hdi = az.hdi(partial_pooling_idata)
-partial_pooling_mean_lower = []
-partial_pooling_mean_higher= []
-partial_pooling_lower = []
-partial_pooling_higher= []
-
-for hour, row in df.iterrows():
-    for cluster_idx in unique_clusters:
-        if clusters[hour] == cluster_idx:
-            for heat_cluster_idx in unique_heat_clusters:
-                if heat_clusters[hour] == heat_cluster_idx:
-                    for cool_cluster_idx in unique_cool_clusters:
-                        if cool_clusters[hour] == cool_cluster_idx:
-
-                            partial_pooling_predictions.append(partial_pooling_acluster_means[cluster_idx] + \
-                                                               partial_pooling_bs1_means[cluster_idx] * daypart_fs_sin_1[hour] + \
-                                                               partial_pooling_bs2_means[cluster_idx] * daypart_fs_sin_2[hour] + \
-                                                               partial_pooling_bs3_means[cluster_idx] * daypart_fs_sin_3[hour] + \
-                                                               partial_pooling_bs4_means[cluster_idx] * daypart_fs_sin_4[hour] + \
-                                                               partial_pooling_bs5_means[cluster_idx] * daypart_fs_sin_5[hour] + \
-                                                               partial_pooling_bc1_means[cluster_idx] * daypart_fs_cos_1[hour] + \
-                                                               partial_pooling_bc2_means[cluster_idx] * daypart_fs_cos_2[hour] + \
-                                                               partial_pooling_bc3_means[cluster_idx] * daypart_fs_cos_3[hour] + \
-                                                               partial_pooling_bc4_means[cluster_idx] * daypart_fs_cos_4[hour] + \
-                                                               partial_pooling_bc5_means[cluster_idx] * daypart_fs_cos_5[hour] + \
-                                                               partial_pooling_bth_means[heat_cluster_idx] * outdoor_temp_h[hour] + \
-                                                               partial_pooling_btc_means[cool_cluster_idx] * outdoor_temp_c[hour])
-
 
 # Calculate prediction error
 predictions = np.exp(partial_pooling_predictions)
@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import pandas as pd
+
+results_path = "/root/benedetto/results/bayes_results.sqlite"
+
+# Model results of the portfolio, one row per building keyed (and indexed) by building id. The workers append their
+# building in its own transaction and SQLite in WAL mode serializes the writers, so no row is lost when buildings
+# finish together and adding a building costs the same whatever the size of the results. The rows are stored as JSON
+# since the exported metrics depend on the comparison that is run; export_results writes the usual results csv
+
+# The manifest keeps the status of every building run ('done', 'preprocessing_failed', 'modeling_failed') with the
+# hashes of the specs and of the building data it was run with, so that a rerun only schedules what is outstanding
+
+# Seconds a writer waits for the lock of another one
+busy_timeout = 60
+
+
+def connect(path=results_path):
+    connection = sqlite3.connect(path, timeout=busy_timeout)
+    # WAL mode is persistent, switching needs an exclusive lock so it is only done once (create_store in the parent)
+    if connection.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS results (id TEXT PRIMARY KEY, row TEXT NOT NULL)")
+    connection.execute("CREATE TABLE IF NOT EXISTS manifest (id TEXT PRIMARY KEY, spec_hash TEXT NOT NULL, "
+                       "data_hash TEXT NOT NULL, status TEXT NOT NULL)")
+    return connection
+
+
+def create_store(path=results_path):
+    connect(path).close()
+
+
+def add_results(export_df, path=results_path):
+    # Rows of an export df (with an 'id' column) added atomically, replacing earlier results of the same buildings
+    rows = [(str(row['id']), json.dumps(row, default=float)) for row in export_df.to_dict(orient='records')]
+    connection = connect(path)
+    try:
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO results (id, row) VALUES (?, ?)", rows)
+    finally:
+        connection.close()
+
+
+def has_results(building_id, path=results_path):
+    connection = connect(path)
+    try:
+        return connection.execute("SELECT 1 FROM results WHERE id = ?", (building_id,)).fetchone() is not None
+    finally:
+        connection.close()
+
+
+def completed_ids(path=results_path):
+    connection = connect(path)
+    try:
+        return {building_id for building_id, in connection.execute("SELECT id FROM results")}
+    finally:
+        connection.close()
+
+
+def load_manifest(path=results_path):
+    # Building id -> (spec hash, data hash, status)
+    connection = connect(path)
+    try:
+        return {building_id: (spec_hash, data_hash, status) for building_id, spec_hash, data_hash, status in
+                connection.execute("SELECT id, spec_hash, data_hash, status FROM manifest")}
+    finally:
+        connection.close()
+
+
+def set_status(building_id, spec_hash, data_hash, status, path=results_path):
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO manifest (id, spec_hash, data_hash, status) VALUES (?, ?, ?, ?)",
+                               (building_id, spec_hash, data_hash, status))
+    finally:
+        connection.close()
+
+
+def load_results(path=results_path):
+    connection = connect(path)
+    try:
+        rows = [json.loads(row) for row, in connection.execute("SELECT row FROM results ORDER BY rowid")]
+    finally:
+        connection.close()
+    return pd.DataFrame(rows)
+
+
+def cluster_counts(path=results_path):
+    # Building id -> profile clusters of the buildings with results (rows of earlier runs without n_clusters are
+    # left out)
+    results = load_results(path)
+    if 'n_clusters' not in results.columns:
+        return {}
+    results = results.dropna(subset=['n_clusters'])
+    return dict(zip(results['id'].astype(str), results['n_clusters'].astype(int)))
+
+
+def import_results(csv_path="/root/benedetto/results/bayes_results.csv", path=results_path):
+    # Results of an earlier csv run added to the store
+    add_results(pd.read_csv(csv_path), path)
+
+
+def export_results(csv_path="/root/benedetto/results/bayes_results.csv", path=results_path):
+    load_results(path).to_csv(csv_path, index=False)